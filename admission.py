@@ -0,0 +1,241 @@
+# admission.py
+import logging
+import re
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from agent.config import (
+    MAX_CONCURRENT_QUERIES,
+    MAX_QUEUED_QUERIES,
+    QUEUE_DEADLINE_SECONDS,
+    SESSION_RATE_PER_MINUTE,
+    SESSION_BURST,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+BUSY_MESSAGE = (
+    "We are experiencing a high volume of requests right now. "
+    "Please try again in a moment."
+)
+
+RATE_LIMITED_MESSAGE = (
+    "You are sending messages faster than I can answer them. "
+    "Please wait a few seconds and try again."
+)
+
+# Structured answers for common generic queries, served without calling the LLM
+# when the system is overloaded. Patterns are checked in order. Only add answers
+# that the generic agent's system prompt already commits to.
+FAST_PATH_ANSWERS = [
+    (r"\b(track|tracking|shipment|where is my (order|package))\b",
+     "Please share your tracking number and a callback number. We will check the "
+     "shipment status and call you back within 1 hour."),
+]
+
+
+class TokenBucket:
+    """Token bucket allowing `rate` requests per second with bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: int, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated = clock()
+
+    def try_acquire(self) -> bool:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class AdmissionController:
+    """
+    Guard LLM-bound work with a concurrency cap, a bounded wait queue and
+    per-session rate limits. Each session has at most one request in flight,
+    since its turns share one conversation thread; later requests from the
+    same session wait for it before queueing for a slot, so they never hold
+    a slot while blocked on their own session. Rejected requests are answered in degraded mode
+    with the structured fast-path answers or a busy message. Previous LLM
+    answers are never replayed, since they depend on the conversation.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = MAX_CONCURRENT_QUERIES,
+        max_queue: int = MAX_QUEUED_QUERIES,
+        deadline: float = QUEUE_DEADLINE_SECONDS,
+        session_rate_per_minute: float = SESSION_RATE_PER_MINUTE,
+        session_burst: int = SESSION_BURST,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self.session_rate = session_rate_per_minute / 60.0
+        self.session_burst = session_burst
+        self.clock = clock
+        # A bucket idle for this long has refilled and can be recreated on demand
+        self.bucket_ttl = session_burst / self.session_rate if self.session_rate else float("inf")
+
+        self._lock = threading.Lock()
+        self._slot_free = threading.Condition(self._lock)
+        self._in_flight = 0
+        self._queued = 0
+        self._session_waiting = 0
+        self._active_sessions = set()
+        self._avg_service_time: Optional[float] = None
+        self._last_shed_reason = "shed_queue_full"
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._last_sweep = clock()
+        self._counters = {
+            "admitted": 0,
+            "completed": 0,
+            "shed_queue_full": 0,
+            "shed_deadline": 0,
+            "shed_rate_limited": 0,
+            "degraded_fast_path": 0,
+        }
+
+    def run(self, session_id: str, query: str, handler: Callable[[], str]) -> str:
+        """Run handler if admitted, otherwise return a degraded answer"""
+        with self._lock:
+            if not self._bucket(session_id).try_acquire():
+                return self._shed("shed_rate_limited", query, RATE_LIMITED_MESSAGE)
+
+            if not self._wait_for_admission(session_id):
+                return self._shed(self._last_shed_reason, query, BUSY_MESSAGE)
+
+            self._active_sessions.add(session_id)
+            self._in_flight += 1
+            self._counters["admitted"] += 1
+
+        started = self.clock()
+        try:
+            return handler()
+        finally:
+            elapsed = self.clock() - started
+            with self._lock:
+                self._active_sessions.discard(session_id)
+                self._in_flight -= 1
+                self._counters["completed"] += 1
+                self._record_service_time(elapsed)
+                # Waiters differ in what they wait for (a slot or their own session)
+                self._slot_free.notify_all()
+
+    def metrics(self) -> Dict[str, float]:
+        """Snapshot of queue depth, in-flight work and shed counters"""
+        with self._lock:
+            return {
+                "queue_depth": self._queued,
+                "session_waiting": self._session_waiting,
+                "in_flight": self._in_flight,
+                "avg_service_time": self._avg_service_time or 0.0,
+                "sessions_tracked": len(self._buckets),
+                **self._counters,
+            }
+
+    # Must be called with self._lock held
+    def _wait_for_admission(self, session_id: str) -> bool:
+        deadline_at = self.clock() + self.deadline
+
+        # Wait for this session's previous request outside the slot queue
+        self._session_waiting += 1
+        try:
+            if not self._wait_until(lambda: session_id not in self._active_sessions, deadline_at):
+                return False
+        finally:
+            self._session_waiting -= 1
+
+        return self._wait_for_slot(session_id, deadline_at)
+
+    # Must be called with self._lock held
+    def _wait_for_slot(self, session_id: str, deadline_at: float) -> bool:
+        if self._in_flight < self.max_concurrency and self._queued == 0:
+            return True
+
+        if self._queued >= self.max_queue:
+            self._last_shed_reason = "shed_queue_full"
+            return False
+
+        # Reject now if the expected wait already exceeds the deadline
+        if self._avg_service_time is not None:
+            expected_wait = (self._queued + 1) * self._avg_service_time / self.max_concurrency
+            if expected_wait > deadline_at - self.clock():
+                self._last_shed_reason = "shed_deadline"
+                return False
+
+        self._queued += 1
+        try:
+            # Another request from this session may have taken its turn meanwhile
+            return self._wait_until(
+                lambda: self._in_flight < self.max_concurrency and session_id not in self._active_sessions,
+                deadline_at
+            )
+        finally:
+            self._queued -= 1
+
+    # Must be called with self._lock held
+    def _wait_until(self, ready: Callable[[], bool], deadline_at: float) -> bool:
+        while True:
+            remaining = deadline_at - self.clock()
+            if remaining <= 0:
+                self._last_shed_reason = "shed_deadline"
+                return False
+            if ready():
+                return True
+            self._slot_free.wait(remaining)
+
+    # Must be called with self._lock held
+    def _bucket(self, session_id: str) -> TokenBucket:
+        now = self.clock()
+        if now - self._last_sweep > self.bucket_ttl:
+            self._buckets = {
+                key: bucket for key, bucket in self._buckets.items()
+                if now - bucket.updated <= self.bucket_ttl
+            }
+            self._last_sweep = now
+
+        bucket = self._buckets.get(session_id)
+        if bucket is None:
+            bucket = TokenBucket(self.session_rate, self.session_burst, self.clock)
+            self._buckets[session_id] = bucket
+        return bucket
+
+    def _record_service_time(self, elapsed: float) -> None:
+        if self._avg_service_time is None:
+            self._avg_service_time = elapsed
+        else:
+            self._avg_service_time = 0.8 * self._avg_service_time + 0.2 * elapsed
+
+    # Must be called with self._lock held
+    def _shed(self, reason: str, query: str, default: str) -> str:
+        self._counters[reason] += 1
+        logger.warning(
+            f"Load shedding ({reason}): queue_depth={self._queued} in_flight={self._in_flight}"
+        )
+        for pattern, answer in FAST_PATH_ANSWERS:
+            if re.search(pattern, query, re.IGNORECASE):
+                self._counters["degraded_fast_path"] += 1
+                return answer
+        return default
+
+
+def log_metrics_periodically(controller: AdmissionController, interval: float) -> threading.Thread:
+    """Log a metrics snapshot every `interval` seconds from a daemon thread"""
+    def _loop():
+        while True:
+            time.sleep(interval)
+            logger.info(f"Admission metrics: {controller.metrics()}")
+
+    thread = threading.Thread(target=_loop, name="admission-metrics", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,204 @@
+# compact_checkpointer.py
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Set, Tuple
+
+from langchain_core.messages import BaseMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MESSAGES_CHANNEL = "messages"
+DIGEST_SIZE = 16
+
+# Blob type tags used in place of the serializer's own tags
+MESSAGE_REFS = "msgrefs"
+MESSAGE_DELTA = "msgdelta"
+EMPTY = "empty"
+
+
+class _InterningSerializer:
+    """
+    Wrap a checkpoint serializer so lists of messages are stored as digests
+    into a shared table of message bodies, each body serialized once.
+
+    Bodies are reference counted by thread: each thread that interns a body
+    holds one reference, released when the thread is deleted. Queries run
+    concurrently, so the body table and counts are updated under one lock.
+    """
+
+    def __init__(self, serde, bodies: Dict[bytes, Tuple[str, bytes]], blobs: dict):
+        self.serde = serde
+        self.bodies = bodies
+        self.blobs = blobs
+        self.thread_digests: Dict[str, Set[bytes]] = {}
+        self.refcounts: Dict[bytes, int] = {}
+        self._context = threading.local()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def for_thread(self, thread_id: str):
+        """Attribute the bodies interned in this block to thread_id"""
+        previous = getattr(self._context, "thread_id", None)
+        self._context.thread_id = thread_id
+        try:
+            yield
+        finally:
+            self._context.thread_id = previous
+
+    def intern(self, message: BaseMessage) -> bytes:
+        typed = self.serde.dumps_typed(message)
+        digest = hashlib.blake2b(
+            typed[0].encode() + b"\0" + typed[1], digest_size=DIGEST_SIZE
+        ).digest()
+        thread_id = getattr(self._context, "thread_id", None)
+
+        with self._lock:
+            self.bodies.setdefault(digest, typed)
+            if thread_id is not None:
+                digests = self.thread_digests.setdefault(thread_id, set())
+                if digest not in digests:
+                    digests.add(digest)
+                    self.refcounts[digest] = self.refcounts.get(digest, 0) + 1
+        return digest
+
+    def release(self, thread_id: str) -> None:
+        """Drop thread_id's references, freeing bodies no other thread uses"""
+        with self._lock:
+            for digest in self.thread_digests.pop(thread_id, ()):
+                self.refcounts[digest] -= 1
+                if not self.refcounts[digest]:
+                    del self.refcounts[digest]
+                    self.bodies.pop(digest, None)
+
+    def messages_from(self, digests: bytes) -> list:
+        return [
+            self.serde.loads_typed(self.bodies[digests[i:i + DIGEST_SIZE]])
+            for i in range(0, len(digests), DIGEST_SIZE)
+        ]
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        if _is_message_list(obj):
+            return MESSAGE_REFS, b"".join(self.intern(message) for message in obj)
+        return self.serde.dumps_typed(obj)
+
+    def resolve_digests(self, data: Tuple[str, bytes]) -> bytes:
+        """Follow a chain of message deltas back to its last full digest list"""
+        suffixes = []
+        while data[0] == MESSAGE_DELTA:
+            base_key, appended = data[1].split(b"\n", 1)
+            suffixes.append(appended)
+            thread_id, checkpoint_ns, version = base_key.decode().split("\0")
+            data = self.blobs[(thread_id, checkpoint_ns, MESSAGES_CHANNEL, version)]
+        return data[1] + b"".join(reversed(suffixes))
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        if data[0] in (MESSAGE_REFS, MESSAGE_DELTA):
+            return self.messages_from(self.resolve_digests(data))
+        return self.serde.loads_typed(data)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.serde, name)
+
+
+class CompactMemorySaver(MemorySaver):
+    """
+    In-memory checkpointer that keeps per-session memory roughly linear in
+    conversation length.
+
+    - Message bodies are interned: every message is serialized once and
+      checkpoints refer to it by a 16-byte digest.
+    - Each new version of the messages channel is stored as a delta (the
+      digests appended since the previous version). Every `compact_every`
+      deltas a full digest list is written so loads follow short chains.
+    - Transient channels set to None are stored as empty, so they are absent
+      from the restored state on the next turn.
+    - delete_thread frees the message bodies only that thread referenced.
+
+    This relies on MemorySaver internals (the blobs key layout, the storage
+    and writes tuples, delete_thread), so langgraph and langgraph-checkpoint
+    are pinned in requirements.txt to the versions it was tested with.
+    """
+
+    def __init__(
+        self,
+        compact_every: int = 20,
+        transient_channels: Iterable[str] = ("generic_response", "product_info"),
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.compact_every = compact_every
+        self.transient_channels = frozenset(transient_channels)
+        self.message_bodies: Dict[bytes, Tuple[str, bytes]] = {}
+        self.serde = _InterningSerializer(self.serde, self.message_bodies, self.blobs)
+        # (thread ID, checkpoint NS) -> (version, digests, delta depth) of the latest messages blob
+        self._latest_messages: Dict[Tuple[str, str], Tuple[str, bytes, int]] = {}
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        values = checkpoint["channel_values"]
+
+        stored_versions = dict(new_versions)
+        for channel in self.transient_channels & new_versions.keys():
+            if values.get(channel) is None:
+                self.blobs[(thread_id, checkpoint_ns, channel, new_versions[channel])] = (EMPTY, b"")
+                stored_versions.pop(channel)
+
+        with self.serde.for_thread(thread_id):
+            if MESSAGES_CHANNEL in stored_versions and _is_message_list(values.get(MESSAGES_CHANNEL)):
+                version = stored_versions.pop(MESSAGES_CHANNEL)
+                self.blobs[(thread_id, checkpoint_ns, MESSAGES_CHANNEL, version)] = self._messages_blob(
+                    thread_id, checkpoint_ns, version, values[MESSAGES_CHANNEL]
+                )
+
+            return super().put(config, checkpoint, metadata, stored_versions)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        with self.serde.for_thread(config["configurable"]["thread_id"]):
+            return super().put_writes(config, writes, task_id, task_path)
+
+    def _messages_blob(self, thread_id: str, checkpoint_ns: str, version, messages: list) -> Tuple[str, bytes]:
+        """Encode a messages version as a delta on the previous one, or in full when compacting"""
+        digests = b"".join(self.serde.intern(message) for message in messages)
+        latest = self._latest_messages.get((thread_id, checkpoint_ns))
+
+        if latest is not None:
+            base_version, base_digests, depth = latest
+            if depth < self.compact_every and digests.startswith(base_digests):
+                self._latest_messages[(thread_id, checkpoint_ns)] = (version, digests, depth + 1)
+                base_key = "\0".join((thread_id, checkpoint_ns, base_version)).encode()
+                payload = base_key + b"\n" + digests[len(base_digests):]
+                return MESSAGE_DELTA, payload
+
+        self._latest_messages[(thread_id, checkpoint_ns)] = (version, digests, 0)
+        return MESSAGE_REFS, digests
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        for key in [key for key in self._latest_messages if key[0] == thread_id]:
+            del self._latest_messages[key]
+        self.serde.release(thread_id)
+
+    def storage_bytes(self) -> int:
+        """Approximate bytes held by stored checkpoints, writes, blobs and message bodies"""
+        total = 0
+        for namespaces in self.storage.values():
+            for checkpoints in namespaces.values():
+                for checkpoint, metadata, _ in checkpoints.values():
+                    total += len(checkpoint[1]) + len(metadata[1])
+        for writes in self.writes.values():
+            total += sum(len(value[1]) for _, _, value, _ in writes.values())
+        total += sum(len(blob[1]) for blob in self.blobs.values())
+        total += sum(len(body[1]) + DIGEST_SIZE for body in self.message_bodies.values())
+        return total
+
+
+def _is_message_list(value: Any) -> bool:
+    return isinstance(value, list) and bool(value) and all(
+        isinstance(item, BaseMessage) for item in value
+    )
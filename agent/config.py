@@ -0,0 +1,86 @@
+# config.py
+import os
+import logging
+from functools import lru_cache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Model names
+ROUTER_MODEL = "claude-3-haiku-20240307"
+GENERIC_MODEL = "claude-3-haiku-20240307"
+PRODUCT_REVIEW_MODEL = "claude-3-5-sonnet-20240620"
+EMBEDDING_MODEL = "text-embedding-ada-002"
+
+# Data locations
+PRODUCT_DATA_PATH = 'data/cleaned_dataset_full.csv'
+VECTORSTORE_PATH = 'data/chroma/'
+SIMILAR_PRODUCTS_PATH = 'data/similar_products.npz'
+QUANTIZED_INDEX_PATH = 'data/quantized/'
+
+# Product index: 'hnsw' (Chroma, full precision), 'int8' or 'pq' (quantized with exact re-ranking)
+INDEX_MODE = os.environ.get('INDEX_MODE', 'hnsw')
+# Candidates re-ranked with exact float vectors, as a multiple of k
+QUANTIZED_RERANK_FACTOR = {'int8': 10, 'pq': 50}
+PQ_SUBSPACES = 96
+
+# Similar products
+SIMILAR_PRODUCTS_TOP_N = 5
+SIMILAR_PRODUCTS_CANDIDATES = 50
+# Category path words a comparable product must share past the department name,
+# and the share of a department's products that defines how long that name is
+SIMILAR_PRODUCTS_MIN_SUBCATEGORY_WORDS = 1
+SIMILAR_PRODUCTS_DEPARTMENT_SHARE = 0.9
+COMPARABLE_PRODUCTS_LIMIT = 3
+
+# Checkpointing: 'compact' (delta + interned messages) or 'full' (plain MemorySaver)
+CHECKPOINT_MODE = os.environ.get('CHECKPOINT_MODE', 'compact')
+
+# Admission control
+MAX_CONCURRENT_QUERIES = int(os.environ.get('MAX_CONCURRENT_QUERIES', 4))
+MAX_QUEUED_QUERIES = int(os.environ.get('MAX_QUEUED_QUERIES', 16))
+QUEUE_DEADLINE_SECONDS = float(os.environ.get('QUEUE_DEADLINE_SECONDS', 20))
+SESSION_RATE_PER_MINUTE = float(os.environ.get('SESSION_RATE_PER_MINUTE', 12))
+SESSION_BURST = int(os.environ.get('SESSION_BURST', 4))
+METRICS_LOG_SECONDS = float(os.environ.get('METRICS_LOG_SECONDS', 60))
+
+
+@lru_cache(maxsize=None)
+def load_api_keys() -> None:
+    """Load .env and export provider keys under the names the SDKs expect"""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    if 'ANTHRO_KEY' in os.environ:
+        os.environ['ANTHROPIC_API_KEY'] = os.environ['ANTHRO_KEY']
+    if 'OA_API' in os.environ:
+        os.environ['OPENAI_API_KEY'] = os.environ['OA_API']
+
+
+def _require_key(name: str) -> None:
+    """Raise a clear error if a required API key is missing"""
+    load_api_keys()
+    if name not in os.environ:
+        raise KeyError(f"Environment variable {name} is not set")
+
+
+@lru_cache(maxsize=None)
+def get_chat_model(model_name: str):
+    """Return the shared ChatAnthropic client for model_name, created on first use"""
+    _require_key('ANTHRO_KEY')
+    from langchain_anthropic import ChatAnthropic
+
+    logger.info(f"Creating ChatAnthropic client for model {model_name}")
+    return ChatAnthropic(model=model_name)
+
+
+@lru_cache(maxsize=None)
+def get_embeddings(model_name: str = EMBEDDING_MODEL):
+    """Return the shared OpenAI embeddings client, created on first use"""
+    _require_key('OA_API')
+    from langchain_community.embeddings import OpenAIEmbeddings
+
+    logger.info(f"Creating OpenAIEmbeddings client for model {model_name}")
+    return OpenAIEmbeddings(model=model_name)
@@ -1,22 +1,12 @@
 # generic_agent.py
-import os
 from typing import Dict
 import logging
-from langchain_anthropic import ChatAnthropic
 from langchain_core.messages import HumanMessage, SystemMessage
+from agent.config import get_chat_model, GENERIC_MODEL
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-anthro_api_key = os.environ['ANTHRO_KEY']           
-os.environ['ANTHROPIC_API_KEY'] = anthro_api_key
-
-# Initialize LLM
-# llm = ChatAnthropic(model="claude-3-5-sonnet-20240620")
-
-# Initialize LLM
-llm = ChatAnthropic(model="claude-3-haiku-20240307")
-
 SYSTEM_PROMPT = """
         Role
         You are a knowledgeable and compassionate customer support chatbot specializing in various
@@ -71,16 +61,12 @@ def process_generic_query(state: Dict, config: dict) -> Dict:
 
         messages = [system_message] + state['messages']
 
+        llm = get_chat_model(GENERIC_MODEL)
         response = llm.invoke(messages)
 
-        
-        # Update the state instead of returning new dictionary
-        state["generic_response"] = response.content
-        
-        return state
-        # return {"generic_response": response.content}
+        # Return only the updated key so the checkpointer stores a small delta
+        return {"generic_response": response.content}
     
     except Exception as e:
         logger.error(f"Error in process_generic_query for thread {thread_id}: {e}")
-        state["generic_response"] = "I apologize, but I encountered an error processing your query. Please try again."
-        return state
\ No newline at end of file
+        return {"generic_response": "I apologize, but I encountered an error processing your query. Please try again."}
\ No newline at end of file
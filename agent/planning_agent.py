@@ -4,6 +4,8 @@ import logging
 from langchain_core.messages import AIMessage
 from langgraph.graph import StateGraph, START, END
 from langgraph.checkpoint.memory import MemorySaver
+from agent.compact_checkpointer import CompactMemorySaver
+from agent.config import CHECKPOINT_MODE
 from langgraph.graph.message import add_messages
 from agent.router_agent import planning_route_query
 from agent.generic_agent import process_generic_query
@@ -59,9 +61,9 @@ def prepare_response_for_composer(state: Dict, config: dict) -> Dict:
     try:
         # Extract the response text based on query type
         response_text = ""
-        if "product_info" in state:
+        if state.get("product_info"):
             response_text = state["product_info"]
-        elif "generic_response" in state:
+        elif state.get("generic_response"):
             response_text = state["generic_response"]
             print("*****response_text****", response_text)
         else:
@@ -69,26 +71,32 @@ def prepare_response_for_composer(state: Dict, config: dict) -> Dict:
         
         # Create a temporary state for composer
         composer_state = {
-            "messages": state["messages"],
+            "messages": list(state["messages"]),
             "response_text": response_text
         }
 
         # Call compose_response with state and config
         composed_state = compose_response(composer_state, config)
         
-        # Selectively update state
-        state["final_response"] = composed_state.get("final_response", "")
-        # if "messages" in composed_state:
-        #     state["messages"].extend(composed_state["messages"])
-        
-        return state
+        # Return only the new assistant message and final response. The
+        # intermediate responses have been consumed, so clear them to keep
+        # them out of the checkpoint and out of the next turn.
+        return {
+            "messages": composed_state["messages"][len(state["messages"]):],
+            "final_response": composed_state.get("final_response", ""),
+            "product_info": None,
+            "generic_response": None
+        }
         
     except Exception as e:
         logger.error(f"Error in prepare_response_for_composer: {e}")
         error_message = "I apologize, but I encountered an error. Please try again."
-        state["final_response"] = error_message
-        state["messages"].append(AIMessage(content=error_message))
-        return state
+        return {
+            "messages": [AIMessage(content=error_message)],
+            "final_response": error_message,
+            "product_info": None,
+            "generic_response": None
+        }
 
 
 def route_next_step(state: Dict) -> str:
@@ -106,9 +114,14 @@ def route_next_step(state: Dict) -> str:
 #       Manage state typing throughout the workflow
 
 
-def setup_agent_graph(State: Type) -> tuple[StateGraph, MemorySaver]:
-    """Setup and return the agent workflow graph"""
-    memory = MemorySaver()
+def setup_agent_graph(State: Type, checkpoint_mode: str = CHECKPOINT_MODE) -> tuple[StateGraph, MemorySaver]:
+    """
+    Setup and return the agent workflow graph
+
+    checkpoint_mode selects the checkpointer: 'compact' stores message deltas
+    and interned message bodies, 'full' uses the plain MemorySaver.
+    """
+    memory = CompactMemorySaver() if checkpoint_mode == "compact" else MemorySaver()
     workflow = StateGraph(State)
     
     # Add nodes
@@ -1,42 +1,125 @@
 # product_review_agent.py
 import os
+import sys
 import logging
-from typing import Dict
-from langchain_anthropic import ChatAnthropic
-from langchain.schema import HumanMessage, AIMessage, SystemMessage
-from langchain_community.embeddings import OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain.schema import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-import pandas as pd
+import threading
+from typing import Dict, Tuple, TYPE_CHECKING
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 import shutil
 import warnings
-from dotenv import load_dotenv
+from agent.config import (
+    get_chat_model,
+    get_embeddings,
+    PRODUCT_REVIEW_MODEL,
+    PRODUCT_DATA_PATH,
+    VECTORSTORE_PATH,
+    QUANTIZED_INDEX_PATH,
+    INDEX_MODE,
+    SIMILAR_PRODUCTS_PATH,
+    SIMILAR_PRODUCTS_TOP_N,
+    SIMILAR_PRODUCTS_CANDIDATES,
+    COMPARABLE_PRODUCTS_LIMIT,
+)
 
-warnings.filterwarnings("ignore")
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
 
-__import__('pysqlite3')
-import sys
-sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+warnings.filterwarnings("ignore")
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
 
-anthro_api_key = os.environ['ANTHRO_KEY']           
-os.environ['ANTHROPIC_API_KEY'] = anthro_api_key
+_sqlite_swapped = False
+
+
+def _use_pysqlite3() -> None:
+    """Swap in pysqlite3 for sqlite3 before chromadb is imported"""
+    global _sqlite_swapped
+    if _sqlite_swapped:
+        return
+    __import__('pysqlite3')
+    sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+    _sqlite_swapped = True
+
+
+def _load_chroma():
+    """Import and return the Chroma vectorstore class"""
+    _use_pysqlite3()
+    from langchain_community.vectorstores import Chroma
+    return Chroma
+
+
+def load_product_documents(file_path: str = PRODUCT_DATA_PATH) -> list["Document"]:
+    """Load the product catalogue as one document per row"""
+    import pandas as pd
+    from langchain_core.documents import Document
+
+    dataframe = pd.read_csv(file_path)
+    dataframe['combined'] = dataframe.apply(
+        lambda row: ' '.join(f"{col}: {val}" for col, val in row.items()), 
+        axis=1
+    )
+    return [
+        Document(page_content=text, metadata={"product_index": int(index)})
+        for index, text in zip(dataframe['index'], dataframe['combined'])
+    ]
+
+
+def split_product_documents(documents: list["Document"]) -> list["Document"]:
+    """Split documents into the chunks stored in the vector index"""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=300,
+        length_function=len,
+        add_start_index=True,
+    )
+    return splitter.split_documents(documents)
+
+
+def load_product_summaries(file_path: str = PRODUCT_DATA_PATH) -> Dict[int, Tuple[str, str]]:
+    """Category path and comparison summary of each product, keyed by catalogue index"""
+    import pandas as pd
+
+    dataframe = pd.read_csv(
+        file_path,
+        usecols=['index', 'title', 'brand', 'final_price', 'availability', 'reviews_count', 'categories']
+    )
+    return {
+        int(row.index): (
+            str(row.categories),
+            f"title: {row.title} brand: {row.brand} final_price: {row.final_price} "
+            f"availability: {row.availability} reviews_count: {row.reviews_count}"
+        )
+        for row in dataframe.itertuples(index=False)
+    }
+
+
+def build_similar_products_table(vectorstore, file_path: str = PRODUCT_DATA_PATH, **kwargs) -> Dict:
+    """
+    Build the similar products table for a vectorstore of product chunks.
+
+    Needs no LLM client or API key, so offline scripts can call it with a
+    Chroma store opened directly. kwargs go to product_similarity.build_similar_products.
+    """
+    from agent.product_similarity import build_similar_products
+
+    chunks = (
+        (chunk.page_content, chunk.metadata["product_index"])
+        for chunk in split_product_documents(load_product_documents(file_path))
+    )
+    return build_similar_products(vectorstore, chunks, load_product_summaries(file_path), **kwargs)
 
-api_key = os.environ['OA_API']           
-os.environ['OPENAI_API_KEY'] = api_key
 
 class ProductReviewAgent:
-    def __init__(self, model_name="claude-3-5-sonnet-20240620"):
-        self.llm = ChatAnthropic(model=model_name)
-        self.embeddings = OpenAIEmbeddings(model="text-embedding-ada-002")
+    def __init__(self, model_name=PRODUCT_REVIEW_MODEL):
+        self.llm = get_chat_model(model_name)
+        self.embeddings = get_embeddings()
         self.vectorstore = None
+        self.similar_products = None
         
         self.system_prompt = """
         Role and Capabilities:
@@ -111,50 +194,132 @@ class ProductReviewAgent:
         responding. Don't make assumptions or provide speculative information.
         """
         self.initialize_vectorstore()
+        self.load_similar_products()
 
-    def initialize_vectorstore(self, vectorstore_path: str = 'data/chroma/'):
-        """Initialize vector store with product data"""
+    def initialize_vectorstore(
+        self,
+        vectorstore_path: str = VECTORSTORE_PATH,
+        index_mode: str = INDEX_MODE,
+        quantized_path: str = QUANTIZED_INDEX_PATH,
+    ):
+        """
+        Initialize vector store with product data
+
+        index_mode 'hnsw' serves queries from Chroma at full precision. 'int8' and
+        'pq' serve them from a quantized index built beforehand with
+        scripts/build_quantized_index.py, re-ranking a small candidate set with
+        the exact float vectors. If that index has not been built, Chroma is used.
+        """
         try:
-            file_path = 'data/cleaned_dataset_full.csv'
-            dataframe = pd.read_csv(file_path)
-            dataframe['combined'] = dataframe.apply(
-                lambda row: ' '.join(f"{col}: {val}" for col, val in row.items()), 
-                axis=1
-            )
-            
-            documents = [Document(page_content=text) for text in dataframe['combined']]
-            chunks = self._split_text(documents)
-            
-            os.makedirs(vectorstore_path, exist_ok=True)
-            
-            if os.path.exists(vectorstore_path) and os.listdir(vectorstore_path):
-                self.vectorstore = Chroma(
-                    persist_directory=vectorstore_path,
-                    embedding_function=self.embeddings
-                )
-            else:
-                shutil.rmtree(vectorstore_path, ignore_errors=True)
-                self.vectorstore = Chroma.from_documents(
-                    documents=chunks,
-                    embedding=self.embeddings,
-                    persist_directory=vectorstore_path
+            if index_mode != "hnsw":
+                from agent.quantized_index import QuantizedVectorStore, QUANTIZED_MODES
+
+                if index_mode not in QUANTIZED_MODES:
+                    raise ValueError(f"Unknown index mode: {index_mode}")
+                store = None
+                if QuantizedVectorStore.exists(quantized_path):
+                    store = QuantizedVectorStore.load(quantized_path, self.embeddings)
+                if store is not None and store.index.mode == index_mode:
+                    self.vectorstore = store
+                    return
+                logger.error(
+                    f"No {index_mode} index at {quantized_path}, serving from Chroma. "
+                    f"Build it with: python scripts/build_quantized_index.py --mode {index_mode}"
                 )
-                self.vectorstore.persist()
-                
+
+            self.vectorstore = self._load_chroma_store(vectorstore_path)
+
         except Exception as e:
             logger.error(f"Error initializing vectorstore: {str(e)}")
             raise
 
 
-    def _split_text(self, documents: list[Document]) -> list[Document]:
-        """Split documents into chunks"""
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=300,
-            length_function=len,
-            add_start_index=True,
+    def _load_chroma_store(self, vectorstore_path: str):
+        """Open the persisted Chroma index, building it from the catalogue if missing"""
+        Chroma = _load_chroma()
+        os.makedirs(vectorstore_path, exist_ok=True)
+        
+        if os.path.exists(vectorstore_path) and os.listdir(vectorstore_path):
+            return Chroma(
+                persist_directory=vectorstore_path,
+                embedding_function=self.embeddings
+            )
+
+        chunks = self._split_text(self._load_documents())
+        shutil.rmtree(vectorstore_path, ignore_errors=True)
+        vectorstore = Chroma.from_documents(
+            documents=chunks,
+            embedding=self.embeddings,
+            persist_directory=vectorstore_path
+        )
+        vectorstore.persist()
+        return vectorstore
+
+
+    def _load_documents(self, file_path: str = PRODUCT_DATA_PATH) -> list["Document"]:
+        """Load the product catalogue as one document per row"""
+        return load_product_documents(file_path)
+
+
+    def load_similar_products(self, path: str = SIMILAR_PRODUCTS_PATH):
+        """Load the precomputed similar products table if it has been built"""
+        from agent.product_similarity import SimilarProducts
+
+        try:
+            self.similar_products = SimilarProducts.load(path)
+        except Exception as e:
+            logger.error(f"Error loading similar products table: {str(e)}")
+            self.similar_products = None
+
+
+    def build_similar_products(
+        self,
+        path: str = SIMILAR_PRODUCTS_PATH,
+        top_n: int = SIMILAR_PRODUCTS_TOP_N,
+        candidates: int = SIMILAR_PRODUCTS_CANDIDATES,
+        method: str = "exact",
+        block_size: int = 2048,
+        page_size: int = 5000,
+    ) -> Dict:
+        """Precompute each product's most comparable products from the embedded catalogue"""
+        table = build_similar_products_table(
+            self.vectorstore, path=path, top_n=top_n, candidates=candidates,
+            method=method, block_size=block_size, page_size=page_size,
         )
-        return splitter.split_documents(documents)
+        if table:
+            self.load_similar_products(path)
+        return table
+
+
+    def _comparable_products(self, results: list["Document"]) -> str:
+        """Summaries of precomputed similar products for the retrieved ones"""
+        if self.similar_products is None:
+            return ""
+
+        retrieved = []
+        for doc in results:
+            product_id = self.similar_products.product_of(doc.page_content, doc.metadata)
+            if product_id is None:
+                logger.warning(f"Retrieved chunk not matched to a product: {doc.page_content[:80]!r}")
+            else:
+                retrieved.append(product_id)
+        seen = set(retrieved)
+
+        lines = []
+        for product_id in retrieved:
+            for neighbor in self.similar_products.lookup(product_id, COMPARABLE_PRODUCTS_LIMIT):
+                if neighbor in seen:
+                    continue
+                seen.add(neighbor)
+                summary = self.similar_products.summary(neighbor)
+                if summary:
+                    lines.append(summary)
+        return "\n".join(lines)
+
+
+    def _split_text(self, documents: list["Document"]) -> list["Document"]:
+        """Split documents into chunks"""
+        return split_product_documents(documents)
 
 
     def process_review_query(self, state: Dict, config: dict) -> Dict:
@@ -177,6 +342,10 @@ class ProductReviewAgent:
                 return {"error": "No relevant information found"}
                 
             context = "\n\n".join([doc.page_content for doc in results])
+
+            comparable = self._comparable_products(results)
+            if comparable:
+                context += "\n\nSimilar products in the same category:\n" + comparable
             
             # Format messages with system prompt
             messages = [
@@ -205,7 +374,16 @@ class ProductReviewAgent:
         {query}
         """
 
+_agent = None
+_agent_lock = threading.Lock()
+
+
 def setup_product_review_agent() -> ProductReviewAgent:
-    """Setup and return the product review agent"""
-    return ProductReviewAgent()
+    """Setup and return the product review agent, built once on first use"""
+    global _agent
+    # Concurrent first requests wait for one agent instead of each loading the index
+    with _agent_lock:
+        if _agent is None:
+            _agent = ProductReviewAgent()
+        return _agent
 
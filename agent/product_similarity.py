@@ -0,0 +1,405 @@
+# product_similarity.py
+import os
+import re
+import hashlib
+import logging
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from agent.config import (
+    SIMILAR_PRODUCTS_PATH,
+    SIMILAR_PRODUCTS_TOP_N,
+    SIMILAR_PRODUCTS_CANDIDATES,
+    SIMILAR_PRODUCTS_MIN_SUBCATEGORY_WORDS,
+    SIMILAR_PRODUCTS_DEPARTMENT_SHARE,
+)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_INDEX_PATTERN = re.compile(r"^\s*index:\s*(\d+)\b")
+
+
+def chunk_key(page_content: str) -> int:
+    """Stable 64-bit key of a chunk's text"""
+    return int.from_bytes(
+        hashlib.blake2b(page_content.encode(), digest_size=8).digest(), "little", signed=True
+    )
+
+
+def product_index_of(page_content: str, metadata: Optional[dict] = None) -> Optional[int]:
+    """
+    Return the catalogue index of the product a chunk was cut from, if it can
+    be read from the chunk itself (metadata, or the leading 'index: N' field)
+    """
+    if metadata and metadata.get("product_index") is not None:
+        return int(metadata["product_index"])
+    match = _INDEX_PATTERN.match(page_content)
+    return int(match.group(1)) if match else None
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _encode_category_paths(category_paths: Sequence[str]) -> np.ndarray:
+    """Encode flattened category paths as padded arrays of word ids (0 = padding)"""
+    vocabulary: Dict[str, int] = {}
+    paths = [str(path).split() for path in category_paths]
+    width = max((len(words) for words in paths), default=0)
+    encoded = np.zeros((len(paths), width), dtype=np.int32)
+    for row, words in enumerate(paths):
+        encoded[row, :len(words)] = [vocabulary.setdefault(word, len(vocabulary) + 1) for word in words]
+    return encoded
+
+
+def department_depths(
+    category_paths: Sequence[str], share: float = SIMILAR_PRODUCTS_DEPARTMENT_SHARE
+) -> np.ndarray:
+    """
+    Number of leading words that name each product's department.
+
+    Category paths are flattened to words, so a department can be one word
+    ('electronics') or several ('clothing shoes jewelry'). Products are grouped
+    by their first word, and the department is the longest prefix that at
+    least `share` of the group has in common. This is a word-level heuristic,
+    not a parsed category tree.
+    """
+    words = [str(path).split() for path in category_paths]
+    groups: Dict[str, List[int]] = defaultdict(list)
+    for row, path in enumerate(words):
+        if path:
+            groups[path[0]].append(row)
+
+    depth_of: Dict[str, int] = {}
+    for department, rows in groups.items():
+        depth = 1
+        while True:
+            prefixes = Counter(tuple(words[row][:depth + 1]) for row in rows if len(words[row]) > depth)
+            if not prefixes or prefixes.most_common(1)[0][1] < share * len(rows):
+                break
+            depth += 1
+        depth_of[department] = depth
+
+    return np.array([depth_of[path[0]] if path else 0 for path in words], dtype=np.int32)
+
+
+def _exact_candidates(vectors: np.ndarray, count: int, block_size: int) -> np.ndarray:
+    """
+    Blocked exact top-`count` cosine neighbours of every row (self excluded).
+
+    Only a (block_size x block_size) score tile and a running best list are
+    held in memory at a time. Cost is O(n^2 d), fine up to ~100k products.
+    """
+    n = vectors.shape[0]
+    k = min(count, n - 1)
+    neighbors = np.full((n, count), -1, dtype=np.int64)
+    if k <= 0:
+        return neighbors
+
+    for row_start in range(0, n, block_size):
+        row_end = min(row_start + block_size, n)
+        rows = vectors[row_start:row_end]
+        best_scores = np.full((row_end - row_start, k), -np.inf, dtype=np.float32)
+        best_ids = np.full((row_end - row_start, k), -1, dtype=np.int64)
+
+        for col_start in range(0, n, block_size):
+            col_end = min(col_start + block_size, n)
+            tile = rows @ vectors[col_start:col_end].T
+
+            # Exclude each product from its own neighbour list
+            lo, hi = max(row_start, col_start), min(row_end, col_end)
+            if lo < hi:
+                diag = np.arange(lo, hi)
+                tile[diag - row_start, diag - col_start] = -np.inf
+
+            merged_scores = np.concatenate([best_scores, tile], axis=1)
+            merged_ids = np.concatenate(
+                [best_ids, np.broadcast_to(np.arange(col_start, col_end), tile.shape)], axis=1
+            )
+            keep = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(merged_scores, keep, axis=1)
+            best_ids = np.take_along_axis(merged_ids, keep, axis=1)
+
+        neighbors[row_start:row_end, :k] = best_ids
+    return neighbors
+
+
+def _hnsw_candidates(vectors: np.ndarray, count: int, block_size: int) -> np.ndarray:
+    """Approximate top-`count` neighbours from a faiss HNSW index, O(n log n)"""
+    import faiss
+
+    index = faiss.IndexHNSWFlat(vectors.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+    index.hnsw.efConstruction = 64
+    index.hnsw.efSearch = max(64, 2 * (count + 1))
+    index.add(vectors)
+
+    neighbors = np.full((len(vectors), count), -1, dtype=np.int64)
+    for start in range(0, len(vectors), block_size):
+        _, found = index.search(vectors[start:start + block_size], count + 1)
+        for row, ids in enumerate(found, start=start):
+            ids = ids[(ids != row) & (ids >= 0)][:count]
+            neighbors[row, :len(ids)] = ids
+    return neighbors
+
+
+def build_similarity_table(
+    product_ids: Sequence[int],
+    embeddings: np.ndarray,
+    category_paths: Sequence[str],
+    top_n: int = SIMILAR_PRODUCTS_TOP_N,
+    candidates: int = SIMILAR_PRODUCTS_CANDIDATES,
+    min_subcategory_words: int = SIMILAR_PRODUCTS_MIN_SUBCATEGORY_WORDS,
+    method: str = "exact",
+    block_size: int = 2048,
+) -> Dict[str, np.ndarray]:
+    """
+    Precompute each product's most comparable products.
+
+    The `candidates` nearest products by embedding are ranked by how deep a
+    category path they share with the product (leading words of the flattened
+    path, so 'men shoes athletic running' beats 'men shoes'), then by cosine
+    similarity. Sharing the department alone is not enough: candidates must
+    also share `min_subcategory_words` path words past the department (see
+    department_depths), so 'electronics headphones' and 'electronics
+    computers' are not comparable, nor are men's shoes and women's dresses
+    under 'clothing shoes jewelry'. Products whose path is no longer than
+    that only match products sharing their whole path.
+
+    Args:
+        product_ids: Catalogue index of each product
+        embeddings: (n, d) product embeddings, one row per product
+        category_paths: Flattened category path of each product
+        top_n: Neighbours to keep per product
+        candidates: Nearest products considered per product
+        min_subcategory_words: Shared path words required past the department
+        method: 'exact' (blocked matrix multiplication) or 'hnsw' (faiss)
+        block_size: Rows per matrix multiplication tile / search batch
+
+    Returns:
+        Dict with 'product_ids' (n,), 'neighbors' (n, top_n) catalogue indices
+        padded with -1, and 'scores' (n, top_n) cosine similarities
+    """
+    product_ids = np.asarray(product_ids, dtype=np.int32)
+    vectors = np.ascontiguousarray(_normalize_rows(np.asarray(embeddings, dtype=np.float32)))
+    paths = _encode_category_paths(category_paths)
+    # A product whose path ends at (or just past) its department must share all of it
+    path_lengths = (paths != 0).sum(axis=1)
+    min_shared = np.minimum(department_depths(category_paths) + min_subcategory_words, path_lengths)
+    min_shared = np.maximum(min_shared, 1)
+
+    if method == "exact":
+        candidate_ids = _exact_candidates(vectors, candidates, block_size)
+    elif method == "hnsw":
+        candidate_ids = _hnsw_candidates(vectors, candidates, block_size)
+    else:
+        raise ValueError(f"Unknown similarity method: {method}")
+
+    neighbors = np.full((len(product_ids), top_n), -1, dtype=np.int32)
+    scores = np.zeros((len(product_ids), top_n), dtype=np.float16)
+
+    # Small row blocks: gathering candidate vectors costs rows x candidates x d floats
+    rerank_block = 128
+    for start in range(0, len(product_ids), rerank_block):
+        end = min(start + rerank_block, len(product_ids))
+        ids = candidate_ids[start:end]
+        valid = ids >= 0
+        safe_ids = np.where(valid, ids, 0)
+
+        # Shared category depth: length of the common leading run of path words
+        same = paths[start:end, None, :] == paths[safe_ids]
+        same &= paths[start:end, None, :] != 0
+        shared = np.cumprod(same, axis=2).sum(axis=2)
+
+        cosine = np.einsum("bd,bkd->bk", vectors[start:end], vectors[safe_ids])
+        # Cosine is in [-1, 1], so one shared word always outranks any cosine gap
+        comparable = valid & (shared >= min_shared[start:end, None])
+        rank = np.where(comparable, shared * 4.0 + cosine, -np.inf)
+
+        order = np.argsort(-rank, axis=1)[:, :top_n]
+        kept = np.take_along_axis(rank, order, axis=1) > -np.inf
+        chosen = np.take_along_axis(safe_ids, order, axis=1)
+        neighbors[start:end, :order.shape[1]] = np.where(kept, product_ids[chosen], -1)
+        scores[start:end, :order.shape[1]] = np.where(
+            kept, np.take_along_axis(cosine, order, axis=1), 0
+        )
+
+    return {"product_ids": product_ids, "neighbors": neighbors, "scores": scores}
+
+
+class ChunkResolver:
+    """
+    Map chunk text to the product it was cut from, for indexes built before
+    chunks carried a product_index. Keys are sorted so lookups are a binary
+    search over two compact arrays.
+    """
+
+    def __init__(self, chunk_keys: np.ndarray, chunk_products: np.ndarray):
+        self.chunk_keys = chunk_keys
+        self.chunk_products = chunk_products
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[Tuple[str, int]]) -> "ChunkResolver":
+        keys, products = [], []
+        for page_content, product_id in chunks:
+            keys.append(chunk_key(page_content))
+            products.append(product_id)
+        keys = np.asarray(keys, dtype=np.int64)
+        order = np.argsort(keys)
+        return cls(keys[order], np.asarray(products, dtype=np.int32)[order])
+
+    def product_of(self, page_content: str, metadata: Optional[dict] = None) -> Optional[int]:
+        """Catalogue index of the product a chunk belongs to, or None if unknown"""
+        product_id = product_index_of(page_content, metadata)
+        if product_id is not None or not len(self.chunk_keys):
+            return product_id
+        key = chunk_key(page_content)
+        position = np.searchsorted(self.chunk_keys, key)
+        if position < len(self.chunk_keys) and self.chunk_keys[position] == key:
+            return int(self.chunk_products[position])
+        return None
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {"chunk_keys": self.chunk_keys, "chunk_products": self.chunk_products}
+
+
+def build_similar_products(
+    vectorstore,
+    chunks: Iterable[Tuple[str, int]],
+    catalogue: Dict[int, Tuple[str, str]],
+    path: str = SIMILAR_PRODUCTS_PATH,
+    top_n: int = SIMILAR_PRODUCTS_TOP_N,
+    candidates: int = SIMILAR_PRODUCTS_CANDIDATES,
+    method: str = "exact",
+    block_size: int = 2048,
+    page_size: int = 5000,
+) -> Dict[str, np.ndarray]:
+    """
+    Build and save the similar products table from a vectorstore of product chunks.
+
+    Args:
+        vectorstore: Store with Chroma's paged get() (Chroma or QuantizedVectorStore)
+        chunks: (text, catalogue index) of every chunk the catalogue splits into,
+            to match chunks stored without product_index metadata
+        catalogue: Catalogue index -> (category path, one-line summary)
+
+    Returns:
+        The saved table, or an empty dict if the vectorstore is empty
+    """
+    # Chunks embedded before product_index metadata existed are matched by text
+    resolver = ChunkResolver.from_chunks(chunks)
+    catalogue_ids = np.array(sorted(catalogue))
+    row_of = {int(pid): row for row, pid in enumerate(catalogue_ids)}
+
+    # Average the chunk embeddings of each product, one page of chunks at a time
+    sums, counts = None, np.zeros(len(row_of), dtype=np.int32)
+    unresolved = offset = 0
+    while True:
+        page = vectorstore.get(
+            include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset
+        )
+        if not len(page["documents"]):
+            break
+        offset += len(page["documents"])
+
+        vectors = np.asarray(page["embeddings"], dtype=np.float32)
+        if sums is None:
+            sums = np.zeros((len(row_of), vectors.shape[1]), dtype=np.float32)
+        rows = np.array([
+            row_of.get(resolver.product_of(document, metadata), -1)
+            for document, metadata in zip(page["documents"], page["metadatas"])
+        ])
+        resolved = rows >= 0
+        unresolved += int((~resolved).sum())
+        np.add.at(sums, rows[resolved], vectors[resolved])
+        np.add.at(counts, rows[resolved], 1)
+
+    if unresolved:
+        logger.warning(f"{unresolved} of {offset} chunks could not be matched to a product")
+    if sums is None:
+        logger.warning("Vectorstore is empty, similar products table not built")
+        return {}
+
+    embedded = np.flatnonzero(counts)
+    product_ids = catalogue_ids[embedded]
+    embeddings = sums[embedded] / counts[embedded, None]
+    category_paths = [catalogue[int(pid)][0] for pid in product_ids]
+
+    table = build_similarity_table(
+        product_ids, embeddings, category_paths,
+        top_n=top_n, candidates=candidates, method=method, block_size=block_size,
+    )
+    table.update(resolver.arrays())
+    # Answers only show short summaries of neighbours, so store those instead of the catalogue
+    table.update(encode_summaries([catalogue[int(pid)][1] for pid in product_ids]))
+    save_similarity_table(table, path)
+    logger.info(f"Built similar products table for {len(product_ids)} products at {path}")
+    return table
+
+
+def encode_summaries(summaries: Sequence[str]) -> Dict[str, np.ndarray]:
+    """Pack one summary string per table row as UTF-8 bytes plus row offsets"""
+    encoded = [summary.encode() for summary in summaries]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(data) for data in encoded])
+    return {
+        "summary_bytes": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        "summary_offsets": offsets,
+    }
+
+
+def save_similarity_table(table: Dict[str, np.ndarray], path: str = SIMILAR_PRODUCTS_PATH) -> None:
+    """Persist the adjacency table as a compressed .npz file"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez_compressed(path, **table)
+
+
+class SimilarProducts:
+    """Constant-time lookup of precomputed similar products"""
+
+    def __init__(self, table: Dict[str, np.ndarray]):
+        self.neighbors = table["neighbors"]
+        self.scores = table["scores"]
+        self._row_of = {int(pid): row for row, pid in enumerate(table["product_ids"])}
+        self.summary_bytes = table.get("summary_bytes")
+        self.summary_offsets = table.get("summary_offsets")
+        if self.summary_bytes is None:
+            logger.warning("Similar products table has no product summaries, rebuild it")
+        self.resolver = ChunkResolver(
+            table.get("chunk_keys", np.zeros(0, dtype=np.int64)),
+            table.get("chunk_products", np.zeros(0, dtype=np.int32)),
+        )
+
+    @classmethod
+    def load(cls, path: str = SIMILAR_PRODUCTS_PATH) -> Optional["SimilarProducts"]:
+        """Load the table from disk, or return None if it has not been built"""
+        if not os.path.exists(path):
+            logger.info(f"No similar products table at {path}")
+            return None
+        with np.load(path) as data:
+            return cls({name: data[name] for name in data.files})
+
+    def product_of(self, page_content: str, metadata: Optional[dict] = None) -> Optional[int]:
+        """Catalogue index of the product a retrieved chunk belongs to"""
+        return self.resolver.product_of(page_content, metadata)
+
+    def lookup(self, product_id: int, limit: Optional[int] = None) -> List[int]:
+        """Return the catalogue indices of products similar to product_id"""
+        row = self._row_of.get(int(product_id))
+        if row is None:
+            return []
+        neighbors = self.neighbors[row, :limit]
+        return [int(pid) for pid in neighbors if pid >= 0]
+
+    def summary(self, product_id: int) -> Optional[str]:
+        """Short description of product_id stored with the table, if any"""
+        row = self._row_of.get(int(product_id))
+        if row is None or self.summary_bytes is None:
+            return None
+        start, end = self.summary_offsets[row], self.summary_offsets[row + 1]
+        return self.summary_bytes[start:end].tobytes().decode()
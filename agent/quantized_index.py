@@ -0,0 +1,361 @@
+# quantized_index.py
+import os
+import sys
+import json
+import math
+import mmap
+import shutil
+import logging
+import tempfile
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from agent.config import QUANTIZED_RERANK_FACTOR, PQ_SUBSPACES
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUANTIZED_MODES = ("int8", "pq")
+# Every file of a saved index; it is usable only when all of them exist
+INDEX_FILES = ("index.json", "index.faiss", "vectors.npy", "documents.jsonl", "documents.offsets.npy")
+
+HNSW_NEIGHBORS = 32
+HNSW_EF_CONSTRUCTION = 64
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def _new_faiss_index(mode: str, count: int, dim: int, subspaces: int):
+    """
+    Untrained faiss index for a quantized mode.
+
+    int8: HNSW graph over 8-bit scalar-quantized vectors.
+    pq:   inverted lists over product-quantized residuals (one byte per
+          subspace), with fewer bits per code on small collections so every
+          centroid gets the ~39 training points faiss asks for.
+    """
+    import faiss
+
+    if mode == "int8":
+        index = faiss.IndexHNSWSQ(dim, faiss.ScalarQuantizer.QT_8bit, HNSW_NEIGHBORS, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        return index
+
+    if dim % subspaces:
+        raise ValueError(f"Dimension {dim} is not divisible by {subspaces} subspaces")
+    lists = max(1, min(int(4 * math.sqrt(count)), count // 39))
+    bits = max(1, min(8, int(math.log2(max(count // 39, 2)))))
+    return faiss.IndexIVFPQ(faiss.IndexFlatIP(dim), dim, lists, subspaces, bits, faiss.METRIC_INNER_PRODUCT)
+
+
+class QuantizedIndex:
+    """
+    Cosine similarity search over a compressed faiss index with exact re-ranking.
+
+    The faiss index (codes plus graph or inverted lists) is held in memory.
+    The full-precision vectors are memory-mapped from disk and read only for
+    the re-ranked candidates.
+    """
+
+    def __init__(self, mode: str, index, vectors: np.ndarray, rerank_factor: Optional[int] = None):
+        self.mode = mode
+        self.index = index
+        self.vectors = vectors
+        self.rerank_factor = rerank_factor or QUANTIZED_RERANK_FACTOR[mode]
+        # Shared faiss settings are fixed here; per-query values go through SearchParameters,
+        # since queries are served from several threads at once
+        if index is not None and mode == "pq":
+            # Probing too few lists, not PQ error, is what limits recall after re-ranking
+            index.nprobe = min(index.nlist, max(32, index.nlist // 8))
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, mode: str = "int8", subspaces: int = PQ_SUBSPACES) -> "QuantizedIndex":
+        if mode not in QUANTIZED_MODES:
+            raise ValueError(f"Unknown quantized index mode: {mode}")
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not vectors.size:
+            return cls(mode, None, np.zeros((0, 0), dtype=np.float32))
+
+        vectors = _normalize_rows(vectors)
+        index = _new_faiss_index(mode, len(vectors), vectors.shape[1], subspaces)
+        index.train(vectors)
+        index.add(vectors)
+        return cls(mode, index, vectors)
+
+    def search(self, query: np.ndarray, k: int = 4, rerank: Optional[int] = None,
+               exact: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (ids, cosine scores) of the k nearest vectors.
+
+        The top `rerank` candidates (k x rerank_factor by default) are
+        re-scored with the float vectors. With exact=False the k best by
+        quantized score are returned in faiss's order, with faiss's scores.
+        """
+        if self.index is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        query = _normalize_rows(np.asarray(query, dtype=np.float32).reshape(1, -1))
+        k = min(k, len(self))
+        candidates = min(len(self), rerank or max(k * self.rerank_factor, k))
+
+        if not exact:
+            scores, found = self.index.search(query, k, params=self._search_parameters(candidates))
+            kept = found[0] >= 0
+            return found[0][kept], scores[0][kept]
+
+        _, found = self.index.search(query, candidates, params=self._search_parameters(candidates))
+        candidate_ids = np.sort(found[0][found[0] >= 0])  # sequential reads from the memory-mapped vectors
+
+        exact = np.asarray(self.vectors[candidate_ids]) @ query[0]
+        top = np.argsort(-exact)[:k]
+        return candidate_ids[top], exact[top]
+
+    def _search_parameters(self, candidates: int):
+        import faiss
+
+        if self.mode == "int8":
+            return faiss.SearchParametersHNSW(efSearch=max(candidates, 64))
+        return faiss.SearchParametersIVF(nprobe=self.index.nprobe)
+
+    def memory_bytes(self) -> int:
+        """Resident bytes of the faiss index (excludes the memory-mapped vectors)"""
+        if self.index is None:
+            return 0
+        import faiss
+
+        return int(faiss.serialize_index(self.index).nbytes)
+
+    def save(self, path: str) -> None:
+        """Write the index files into an existing directory"""
+        import faiss
+
+        faiss.write_index(self.index, os.path.join(path, "index.faiss"))
+        np.save(os.path.join(path, "vectors.npy"), np.asarray(self.vectors, dtype=np.float32))
+        with open(os.path.join(path, "index.json"), "w") as f:
+            json.dump({"mode": self.mode, "count": len(self)}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "QuantizedIndex":
+        import faiss
+
+        with open(os.path.join(path, "index.json")) as f:
+            mode = json.load(f)["mode"]
+        index = faiss.read_index(os.path.join(path, "index.faiss"))
+        vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        return cls(mode, index, vectors)
+
+
+class DocumentFile(Sequence):
+    """
+    Documents stored one JSON record per line and read on access.
+
+    The file is memory-mapped and only a table of line offsets is loaded, so
+    serving a query builds Document objects for the returned hits only.
+    """
+
+    def __init__(self, path: str):
+        self.offsets = np.load(os.path.join(path, "documents.offsets.npy"), mmap_mode="r")
+        with open(os.path.join(path, "documents.jsonl"), "rb") as f:
+            empty = os.fstat(f.fileno()).st_size == 0
+            # Slicing a read-only map is safe from concurrent queries, unlike a shared file position
+            self._data = b"" if empty else mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @staticmethod
+    def write(documents: Sequence[Document], path: str) -> None:
+        offsets = np.zeros(len(documents) + 1, dtype=np.int64)
+        with open(os.path.join(path, "documents.jsonl"), "wb") as f:
+            for i, doc in enumerate(documents):
+                line = json.dumps({"page_content": doc.page_content, "metadata": doc.metadata}).encode() + b"\n"
+                f.write(line)
+                offsets[i + 1] = offsets[i] + len(line)
+        np.save(os.path.join(path, "documents.offsets.npy"), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: Union[int, slice]):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        return Document(**json.loads(self._data[self.offsets[i]:self.offsets[i + 1]]))
+
+
+def _documents_memory_bytes(documents: Sequence[Document]) -> int:
+    """Approximate resident bytes of Document objects held in a list"""
+    if isinstance(documents, DocumentFile):
+        return 0  # memory-mapped; pages are read for hits and can be evicted
+    total = sys.getsizeof(documents)
+    for doc in documents:
+        total += sys.getsizeof(doc) + sys.getsizeof(doc.__dict__) + sys.getsizeof(doc.page_content)
+        total += sys.getsizeof(doc.metadata) + sum(
+            sys.getsizeof(key) + sys.getsizeof(value) for key, value in doc.metadata.items()
+        )
+    return total
+
+
+def read_chroma(chroma, page_size: int = 5000) -> Tuple[np.ndarray, List[Document]]:
+    """Stored embeddings and documents of a Chroma collection, read a page at a time"""
+    pages, documents, offset = [], [], 0
+    while True:
+        page = chroma.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset)
+        if not len(page["documents"]):
+            break
+        offset += len(page["documents"])
+        pages.append(np.asarray(page["embeddings"], dtype=np.float32))
+        documents.extend(
+            Document(page_content=text, metadata=metadata or {})
+            for text, metadata in zip(page["documents"], page["metadatas"])
+        )
+    vectors = np.concatenate(pages) if pages else np.zeros((0, 0), dtype=np.float32)
+    return vectors, documents
+
+
+class QuantizedVectorStore(VectorStore):
+    """
+    Read-only LangChain vector store backed by a QuantizedIndex.
+
+    A store loaded from disk keeps its documents in a DocumentFile; one built
+    in memory holds them in a list.
+    """
+
+    def __init__(self, index: QuantizedIndex, documents: Sequence[Document], embedding: Embeddings):
+        self.index = index
+        self.documents = documents
+        self.embedding = embedding
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return all(os.path.exists(os.path.join(path, name)) for name in INDEX_FILES)
+
+    @classmethod
+    def from_embeddings(cls, vectors: np.ndarray, documents: List[Document], embedding: Embeddings,
+                        mode: str = "int8", path: Optional[str] = None) -> "QuantizedVectorStore":
+        """Build (and optionally persist) the store from precomputed embeddings"""
+        store = cls(QuantizedIndex.build(vectors, mode), documents, embedding)
+        if not documents:
+            logger.warning("No embeddings to index, the quantized store is empty and not saved")
+            return store
+        if path:
+            store.save(path)
+            # Reload so the float vectors and documents are memory-mapped rather than resident
+            return cls.load(path, embedding)
+        return store
+
+    @classmethod
+    def from_chroma(cls, chroma, mode: str = "int8", path: Optional[str] = None,
+                    page_size: int = 5000) -> "QuantizedVectorStore":
+        """Build the store from the embeddings already held in a Chroma collection"""
+        vectors, documents = read_chroma(chroma, page_size)
+        return cls.from_embeddings(vectors, documents, chroma.embeddings, mode, path)
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   mode: str = "int8", **kwargs: Any) -> "QuantizedVectorStore":
+        metadatas = metadatas or [{} for _ in texts]
+        documents = [Document(page_content=t, metadata=m) for t, m in zip(texts, metadatas)]
+        return cls.from_embeddings(
+            np.asarray(embedding.embed_documents(list(texts)), dtype=np.float32),
+            documents, embedding, mode, kwargs.get("path")
+        )
+
+    @classmethod
+    def load(cls, path: str, embedding: Embeddings) -> "QuantizedVectorStore":
+        return cls(QuantizedIndex.load(path), DocumentFile(path), embedding)
+
+    def save(self, path: str) -> None:
+        """
+        Write every file to a staging directory, then swap it in with a rename.
+
+        The previous index is kept aside until the swap succeeds and restored
+        if it fails, so a failed save leaves the old index in place.
+        """
+        path = os.path.normpath(path)
+        parent = os.path.dirname(path) or "."
+        os.makedirs(parent, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".quantized-", dir=parent)
+        previous = staging + ".old"
+        try:
+            self.index.save(staging)
+            DocumentFile.write(self.documents, staging)
+            replacing = os.path.exists(path)
+            if replacing:
+                os.rename(path, previous)
+            try:
+                os.rename(staging, path)
+            except OSError:
+                if replacing:
+                    os.rename(previous, path)
+                raise
+            shutil.rmtree(previous, ignore_errors=True)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def memory_bytes(self) -> int:
+        """Resident bytes: the faiss index plus any documents held as Python objects"""
+        return self.index.memory_bytes() + _documents_memory_bytes(self.documents)
+
+    def get(self, include: Optional[List[str]] = None, limit: Optional[int] = None,
+            offset: int = 0) -> Dict[str, list]:
+        """Chroma-compatible page of the stored documents and embeddings"""
+        end = len(self.documents) if limit is None else min(offset + limit, len(self.documents))
+        documents = self.documents[offset:end] if offset < end else []
+        return {
+            "ids": [str(i) for i in range(offset, max(offset, end))],
+            "embeddings": np.asarray(self.index.vectors[offset:end]),
+            "documents": [d.page_content for d in documents],
+            "metadatas": [d.metadata for d in documents],
+        }
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4) -> List[Tuple[Document, float]]:
+        ids, scores = self.index.search(np.asarray(embedding), k)
+        return [(self.documents[i], float(s)) for i, s in zip(ids, scores)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: (score + 1.0) / 2.0
+
+    def max_marginal_relevance_search_by_vector(self, embedding: List[float], k: int = 4, fetch_k: int = 20,
+                                                lambda_mult: float = 0.5, **kwargs: Any) -> List[Document]:
+        from langchain_core.vectorstores.utils import maximal_marginal_relevance
+
+        ids, _ = self.index.search(np.asarray(embedding), fetch_k)
+        if not len(ids):
+            return []
+        selected = maximal_marginal_relevance(
+            np.asarray(embedding, dtype=np.float32),
+            np.asarray(self.index.vectors[ids]),
+            lambda_mult=lambda_mult,
+            k=k,
+        )
+        return [self.documents[ids[i]] for i in selected]
+
+    def max_marginal_relevance_search(self, query: str, k: int = 4, fetch_k: int = 20,
+                                      lambda_mult: float = 0.5, **kwargs: Any) -> List[Document]:
+        return self.max_marginal_relevance_search_by_vector(
+            self.embedding.embed_query(query), k, fetch_k, lambda_mult
+        )
@@ -1,25 +1,13 @@
 # router_agent.py
 from typing import Dict
 import logging
-from langchain_anthropic import ChatAnthropic
 from langchain_core.messages import HumanMessage, AIMessage
-import os
-from dotenv import load_dotenv
+from agent.config import get_chat_model, ROUTER_MODEL
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
-
-anthro_api_key = os.environ['ANTHRO_KEY']           
-os.environ['ANTHROPIC_API_KEY'] = anthro_api_key
-
-# Initialize LLM
-# llm = ChatAnthropic(model="claude-3-5-sonnet-20240620")
-llm = ChatAnthropic(model="claude-3-haiku-20240307")
-
 
 class RouterResponse:
     PRODUCT_REVIEW = "product_review"
@@ -81,6 +69,7 @@ def planning_route_query(state: Dict, config: Dict) -> Dict:
         Return ONLY 'product_review' or 'generic' as response."""
         
         messages = [HumanMessage(content=prompt)]
+        llm = get_chat_model(ROUTER_MODEL)
         response = llm.invoke(messages, config).content.lower().strip()
         
         category = RouterResponse.PRODUCT_REVIEW if RouterResponse.PRODUCT_REVIEW in response else RouterResponse.GENERIC
@@ -2,8 +2,9 @@ from dotenv import load_dotenv
 import logging
 import uuid
 from typing import Dict, Annotated, TypedDict, List, Tuple, NotRequired
-from interface import create_interface
 from agent.planning_agent import setup_agent_graph
+from agent.config import MAX_CONCURRENT_QUERIES, MAX_QUEUED_QUERIES, METRICS_LOG_SECONDS
+from admission import AdmissionController, log_metrics_periodically
 from langchain_core.messages import HumanMessage, AIMessage
 from langgraph.graph.message import add_messages
 
@@ -25,15 +26,37 @@ class AgentManager:
         self.graph, self.memory = setup_agent_graph(State)
         logger.info(f"Initialized AgentManager with session_id: {self.session_id}")
         self.config = {"configurable": {"thread_id": self.session_id}}
+        self.admission = AdmissionController()
 
     def process_query(self, query: str, history: List[Tuple[str, str]], session_id: str=None) -> str:
+        """
+        Run the query through the graph behind admission control
+
+        session_id identifies the client (the Gradio session hash). It is used for rate
+        limiting and as the conversation thread, so clients never share graph state.
+        Admission control runs one request per session at a time, so turns on a thread
+        never start from the same parent checkpoint.
+        """
+        client_id = session_id or self.session_id
+        return self.admission.run(
+            client_id,
+            query,
+            lambda: self._invoke_graph(query, client_id)
+        )
+
+    def metrics(self) -> Dict[str, float]:
+        """Return admission control metrics (queue depth, in-flight, shed counts)"""
+        return self.admission.metrics()
+
+    def _invoke_graph(self, query: str, thread_id: str) -> str:
         try:
                     
             # Create input state with just the new message
             input_state = {
                 "messages": [HumanMessage(content=query)],
-                "session_id" : self.session_id
+                "session_id" : thread_id
             }
+            config = {"configurable": {"thread_id": thread_id}}
         
             # Debug print for input state
             print('*' * 100)
@@ -45,7 +68,7 @@ class AgentManager:
             print('*' * 100)
 
             # Langgraph will automatically merge this with existing state
-            result = self.graph.invoke(input_state, config=self.config)
+            result = self.graph.invoke(input_state, config=config)
             
             # Debug print for result
             print('@' * 100)
@@ -67,8 +90,9 @@ class AgentManager:
 
 
     def clear_context(self, session_id: str) -> tuple[List, str]:
-        """Clear the conversation context for a session"""
+        """Clear the conversation context for a session and free its checkpoints"""
         try:
+            self.memory.delete_thread(session_id)
             return [], ""
         except Exception as e:
             logger.error(f"Error clearing context: {e}")
@@ -78,6 +102,8 @@ class AgentManager:
 def main():
     try:
         load_dotenv()              
+        from interface import create_interface
+
         agent_manager = AgentManager()
         
         logger.info(f"Starting Gradio app")
@@ -86,7 +112,12 @@ def main():
             agent_manager=agent_manager,
             session_id=agent_manager.session_id
         )
-        app.queue()
+        # Let requests reach admission control, but keep Gradio's own queue bounded
+        app.queue(
+            default_concurrency_limit=MAX_CONCURRENT_QUERIES + MAX_QUEUED_QUERIES,
+            max_size=MAX_QUEUED_QUERIES * 4
+        )
+        log_metrics_periodically(agent_manager.admission, METRICS_LOG_SECONDS)
         app.launch(server_name="0.0.0.0", server_port=7860, share=True)
     except Exception as e:
         logger.error(f"Error in main: {e}")
@@ -21,14 +21,23 @@ def create_interface(process_query, agent_manager, session_id):
         
         clear = gr.Button("Clear")
 
-        def process_message(message, history):
-            response = process_query(message, history, session_id)
+        # Hidden components backing the /metrics API endpoint
+        metrics = gr.JSON(visible=False)
+        refresh_metrics = gr.Button(visible=False)
+
+        def client_of(request):
+            # Each browser session is its own client and conversation thread
+            return request.session_hash if request and request.session_hash else session_id
+
+        def process_message(message, history, request: gr.Request):
+            client_id = client_of(request)
+            response = process_query(message, history, client_id)
             history.append((message, response))
             return "", history
 
 
-        def clear_session():
-            return agent_manager.clear_context(session_id)
+        def clear_session(request: gr.Request):
+            return agent_manager.clear_context(client_of(request))
 
         
         msg.submit(
@@ -49,4 +58,14 @@ def create_interface(process_query, agent_manager, session_id):
             [chatbot, msg]
         )
 
+        # Scrape with gradio_client: Client(url).predict(api_name="/metrics").
+        # Bypasses the queue so it still answers when the app is overloaded.
+        refresh_metrics.click(
+            agent_manager.metrics,
+            None,
+            metrics,
+            api_name="metrics",
+            queue=False
+        )
+
     return demo
\ No newline at end of file
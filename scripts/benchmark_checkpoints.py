@@ -0,0 +1,91 @@
+# benchmark_checkpoints.py
+"""
+Measure checkpoint memory per session for each checkpointer mode.
+
+Runs the real agent graph with fake chat models (no API calls), alternating
+generic and product queries, and reports the bytes held by the checkpointer
+after a number of turns.
+
+Usage:
+    python scripts/benchmark_checkpoints.py --turns 10 50 200
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import sys
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import HumanMessage
+
+import agent.generic_agent as generic_agent
+import agent.planning_agent as planning_agent
+import agent.router_agent as router_agent
+from app import State
+
+ANSWER = (
+    "Thank you for reaching out. Here is what I found for you: the item is in stock, "
+    "ships within two business days and has strong reviews for comfort and durability. "
+) * 6
+
+
+class _FakeProductAgent:
+    def process_review_query(self, state, config):
+        return {"review_response": ANSWER}
+
+
+def checkpoint_bytes(memory) -> int:
+    """Bytes held by a MemorySaver's checkpoints, writes and blobs"""
+    if hasattr(memory, "storage_bytes"):
+        return memory.storage_bytes()
+    total = 0
+    for namespaces in memory.storage.values():
+        for checkpoints in namespaces.values():
+            for checkpoint, metadata, _ in checkpoints.values():
+                total += len(checkpoint[1]) + len(metadata[1])
+    for writes in memory.writes.values():
+        total += sum(len(value[1]) for _, _, value, _ in writes.values())
+    total += sum(len(blob[1]) for blob in memory.blobs.values())
+    return total
+
+
+def run_session(mode: str, turns: list) -> dict:
+    """Run max(turns) turns in one session and sample checkpoint size at each mark"""
+    graph, memory = planning_agent.setup_agent_graph(State, checkpoint_mode=mode)
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+    samples = {}
+    for turn in range(1, max(turns) + 1):
+        query = f"Question {turn}: can you tell me about the running shoes and their delivery options?"
+        with contextlib.redirect_stdout(io.StringIO()):
+            graph.invoke({"messages": [HumanMessage(content=query)]}, config=config)
+        if turn in turns:
+            samples[turn] = checkpoint_bytes(memory)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark checkpoint bytes per session")
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 50, 200])
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    router_llm = FakeListChatModel(responses=["generic", "product_review"])
+    answer_llm = FakeListChatModel(responses=[ANSWER])
+    router_agent.get_chat_model = lambda model_name: router_llm
+    generic_agent.get_chat_model = lambda model_name: answer_llm
+    planning_agent.setup_product_review_agent = _FakeProductAgent
+
+    results = {mode: run_session(mode, args.turns) for mode in ("full", "compact")}
+
+    print(f"{'turns':>6} {'full bytes':>14} {'compact bytes':>14} {'ratio':>7}")
+    for turn in args.turns:
+        full, compact = results["full"][turn], results["compact"][turn]
+        print(f"{turn:>6} {full:>14,} {compact:>14,} {full / compact:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
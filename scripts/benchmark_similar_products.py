@@ -0,0 +1,100 @@
+# benchmark_similar_products.py
+"""
+Benchmark building the similar products table on synthetic catalogues.
+
+Generates embeddings clustered around three-level category paths
+(department / category / leaf) with Zipf-distributed department sizes, like
+the shipped dataset, then reports build time, peak working memory and the
+size of the resulting adjacency table for each catalogue size.
+
+"peak MiB" is traced Python/NumPy allocations during the build and misses
+faiss's own (C++) memory; "peak RSS MiB" is the process high-water mark,
+including the input embeddings, so run one size per process to compare it.
+
+The exact method is O(n^2 d); use --method hnsw (faiss) for large sizes.
+
+Usage:
+    python scripts/benchmark_similar_products.py --sizes 1000 10000 100000 --dim 1536
+    python scripts/benchmark_similar_products.py --sizes 1000000 --dim 256 --method hnsw
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.product_similarity import build_similarity_table
+
+
+def synthetic_catalogue(size: int, dim: int, num_departments: int, seed: int = 0):
+    """Random embeddings clustered by three-level category path"""
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, num_departments + 1)
+    departments = rng.choice(num_departments, size=size, p=weights / weights.sum())
+    categories = rng.integers(0, 8, size=size)
+    leaves = rng.integers(0, 4, size=size)
+    paths = np.char.add(
+        np.char.add(np.char.add("d", departments.astype(str)), np.char.add(" c", categories.astype(str))),
+        np.char.add(" l", leaves.astype(str)),
+    )
+
+    # Products near their leaf centroid, leaves near their department centroid
+    leaf_ids = (departments * 8 + categories) * 4 + leaves
+    department_centres = rng.standard_normal((num_departments, dim), dtype=np.float32)
+    leaf_offsets = rng.standard_normal((num_departments * 32, dim), dtype=np.float32) * 0.5
+    embeddings = np.empty((size, dim), dtype=np.float32)
+    for start in range(0, size, 65536):
+        end = min(start + 65536, size)
+        embeddings[start:end] = (
+            department_centres[departments[start:end]]
+            + leaf_offsets[leaf_ids[start:end]]
+            + rng.standard_normal((end - start, dim), dtype=np.float32)
+        )
+    return np.arange(size), embeddings, paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark similar products table build")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--departments", type=int, default=27)
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--candidates", type=int, default=50)
+    parser.add_argument("--method", choices=["exact", "hnsw"], default="exact")
+    parser.add_argument("--block-size", type=int, default=2048)
+    args = parser.parse_args()
+
+    print(f"{'products':>10} {'method':>7} {'build s':>10} {'input MiB':>10} "
+          f"{'peak MiB':>10} {'peak RSS MiB':>13} {'table MiB':>10} {'same leaf':>10}")
+    for size in args.sizes:
+        product_ids, embeddings, paths = synthetic_catalogue(size, args.dim, args.departments)
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        table = build_similarity_table(
+            product_ids, embeddings, paths,
+            top_n=args.top_n, candidates=args.candidates,
+            method=args.method, block_size=args.block_size,
+        )
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # Share of kept neighbours in the product's own leaf category
+        neighbors = table["neighbors"]
+        kept = neighbors >= 0
+        same_leaf = (paths[np.where(kept, neighbors, 0)] == paths[:, None]) & kept
+        table_bytes = sum(array.nbytes for array in table.values())
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+        print(f"{size:>10} {args.method:>7} {elapsed:>10.2f} {embeddings.nbytes / 2**20:>10.1f} "
+              f"{peak / 2**20:>10.1f} {peak_rss:>13.1f} {table_bytes / 2**20:>10.2f} "
+              f"{same_leaf.sum() / max(kept.sum(), 1):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
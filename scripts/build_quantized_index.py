@@ -0,0 +1,49 @@
+# build_quantized_index.py
+"""
+Build the quantized product index from the embeddings stored in Chroma.
+
+Run once before starting the app with INDEX_MODE=int8 or INDEX_MODE=pq, and
+again whenever the Chroma index is rebuilt. The index is written to a staging
+directory and renamed into place, so a running app never sees a partial index.
+No API calls are made.
+
+Usage (from the repository root):
+    python scripts/build_quantized_index.py --mode int8
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.config import INDEX_MODE, QUANTIZED_INDEX_PATH, VECTORSTORE_PATH
+from agent.product_review_agent import _load_chroma
+from agent.quantized_index import QuantizedVectorStore, QUANTIZED_MODES
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the quantized product index")
+    parser.add_argument("--mode", choices=QUANTIZED_MODES,
+                        default=INDEX_MODE if INDEX_MODE in QUANTIZED_MODES else "int8")
+    parser.add_argument("--vectorstore", default=VECTORSTORE_PATH)
+    parser.add_argument("--output", default=QUANTIZED_INDEX_PATH)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.vectorstore) or not os.listdir(args.vectorstore):
+        sys.exit(f"No Chroma index at {args.vectorstore}; start the app once in hnsw mode to build it")
+
+    Chroma = _load_chroma()
+    started = time.perf_counter()
+    store = QuantizedVectorStore.from_chroma(Chroma(persist_directory=args.vectorstore), args.mode, args.output)
+    elapsed = time.perf_counter() - started
+
+    if not store.documents:
+        sys.exit(f"The Chroma collection at {args.vectorstore} is empty, nothing to build")
+    print(f"Chunks: {len(store.documents)}")
+    print(f"Build time: {elapsed:.2f}s")
+    print(f"Resident: {store.memory_bytes() / 2**20:.2f} MiB ({args.mode} index and documents)")
+
+
+if __name__ == "__main__":
+    main()
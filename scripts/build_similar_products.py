@@ -0,0 +1,63 @@
+# build_similar_products.py
+"""
+Precompute the similar products table from the embedded product catalogue.
+
+Reads the product embeddings already stored in the Chroma index, finds each
+product's nearest neighbours, keeps those sharing the deepest category path
+and writes the adjacency table used by ProductReviewAgent to add comparable
+products to answers. Use --method hnsw for catalogues past ~100k products.
+Chroma is opened directly: no API keys are needed and nothing is embedded.
+
+Usage (from the repository root):
+    python scripts/build_similar_products.py --top-n 5 --method exact
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.config import (
+    PRODUCT_DATA_PATH,
+    SIMILAR_PRODUCTS_PATH,
+    SIMILAR_PRODUCTS_TOP_N,
+    SIMILAR_PRODUCTS_CANDIDATES,
+    VECTORSTORE_PATH,
+)
+from agent.product_review_agent import _load_chroma, build_similar_products_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the similar products table")
+    parser.add_argument("--vectorstore", default=VECTORSTORE_PATH)
+    parser.add_argument("--catalogue", default=PRODUCT_DATA_PATH)
+    parser.add_argument("--output", default=SIMILAR_PRODUCTS_PATH)
+    parser.add_argument("--top-n", type=int, default=SIMILAR_PRODUCTS_TOP_N)
+    parser.add_argument("--candidates", type=int, default=SIMILAR_PRODUCTS_CANDIDATES)
+    parser.add_argument("--method", choices=["exact", "hnsw"], default="exact")
+    parser.add_argument("--block-size", type=int, default=2048)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.vectorstore) or not os.listdir(args.vectorstore):
+        sys.exit(f"No Chroma index at {args.vectorstore}; start the app once in hnsw mode to build it")
+
+    Chroma = _load_chroma()
+    started = time.perf_counter()
+    table = build_similar_products_table(
+        Chroma(persist_directory=args.vectorstore), args.catalogue, path=args.output,
+        top_n=args.top_n, candidates=args.candidates, method=args.method, block_size=args.block_size,
+    )
+    if not table:
+        sys.exit("The product vectorstore is empty, nothing to build")
+    elapsed = time.perf_counter() - started
+
+    size = sum(array.nbytes for array in table.values())
+    print(f"Products: {len(table['product_ids'])}")
+    print(f"Build time: {elapsed:.2f}s")
+    print(f"Table size: {size / 1024:.1f} KiB in memory, "
+          f"{os.path.getsize(args.output) / 1024:.1f} KiB on disk ({args.output})")
+
+
+if __name__ == "__main__":
+    main()
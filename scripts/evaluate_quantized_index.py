@@ -0,0 +1,181 @@
+# evaluate_quantized_index.py
+"""
+Compare quantized product indexes with full-precision search.
+
+For each quantized mode, reports resident memory, build time, query latency
+and recall@k against exact float32 cosine search over the same vectors.
+Two float32 baselines are measured the same way: a flat (exact) index and an
+HNSW graph over full-precision vectors, which is what Chroma serves. Every
+row times one query at a time, and its memory is the faiss index plus the
+documents held in memory (none: all rows serve documents memory-mapped from
+disk). Queries are never part of the index:
+
+- By default the index holds the product chunks stored in Chroma, and the
+  queries are the user-style questions in data/eval_queries.txt, embedded
+  with the configured embedding model (needs the OpenAI key).
+- --synthetic N indexes N vectors in many small clusters (like products with
+  a few chunks each) and queries with fresh draws from the same clusters.
+
+Each mode is also run without re-ranking ("raw"): the top k in faiss's own
+order by quantized score, with the same search breadth. This shows the
+quantization error the exact re-ranking step recovers.
+
+Usage (from the repository root):
+    python scripts/evaluate_quantized_index.py --k 2 5 10
+    python scripts/evaluate_quantized_index.py --synthetic 100000 --dim 1536
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.documents import Document
+
+from agent.config import VECTORSTORE_PATH
+from agent.quantized_index import (
+    HNSW_EF_CONSTRUCTION,
+    HNSW_NEIGHBORS,
+    QUANTIZED_MODES,
+    QuantizedVectorStore,
+    _normalize_rows,
+    read_chroma,
+)
+
+QUERIES_PATH = "data/eval_queries.txt"
+
+
+def chroma_collection(path: str):
+    """Stored chunk embeddings and documents from the persisted Chroma index"""
+    from agent.product_review_agent import _load_chroma
+
+    Chroma = _load_chroma()
+    return read_chroma(Chroma(persist_directory=path))
+
+
+def embedded_queries(path: str) -> np.ndarray:
+    """Embed the held-out user questions with the production embedding model"""
+    from agent.config import get_embeddings
+
+    with open(path) as f:
+        questions = [line.strip() for line in f if line.strip()]
+    return np.asarray(get_embeddings().embed_documents(questions), dtype=np.float32)
+
+
+def synthetic_vectors(size: int, dim: int, per_cluster: int = 4, seed: int = 0) -> np.ndarray:
+    """Vectors in small clusters around shared topics, closer to real embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((64, dim), dtype=np.float32)
+    clusters = max(1, size // per_cluster)
+    centers = topics[rng.integers(0, len(topics), clusters)] + rng.standard_normal((clusters, dim), dtype=np.float32)
+    vectors = np.empty((size, dim), dtype=np.float32)
+    for start in range(0, size, 65536):
+        end = min(start + 65536, size)
+        vectors[start:end] = centers[rng.integers(0, clusters, end - start)]
+        vectors[start:end] += 0.7 * rng.standard_normal((end - start, dim), dtype=np.float32)
+    return vectors
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ vectors.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def float32_index(vectors: np.ndarray, kind: str):
+    """Full-precision faiss index: 'flat' (exact) or 'hnsw' (graph, like Chroma)"""
+    import faiss
+
+    if kind == "flat":
+        index = faiss.IndexFlatIP(vectors.shape[1])
+    else:
+        index = faiss.IndexHNSWFlat(vectors.shape[1], HNSW_NEIGHBORS, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    index.add(vectors)
+    return index
+
+
+def timed_search(search, queries: np.ndarray):
+    """Run one query at a time, returning found ids and per-query latencies in ms"""
+    latencies, found = [], []
+    for query in queries:
+        started = time.perf_counter()
+        ids = search(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+        found.append(ids)
+    return found, latencies
+
+
+def report(label, memory_bytes, build_s, found, latencies, truth, ks):
+    recalls = [
+        np.mean([len(set(f[:k]) & set(t[:k])) / k for f, t in zip(found, truth)])
+        for k in ks
+    ]
+    build = f"{build_s:>8.2f}" if build_s is not None else f"{'-':>8}"
+    print(f"{label:<12} {memory_bytes / 2**20:>11.2f} {build} "
+          f"{np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 95):>8.2f}"
+          + "".join(f" {r:>10.3f}" for r in recalls))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate quantized product indexes")
+    parser.add_argument("--vectorstore", default=VECTORSTORE_PATH)
+    parser.add_argument("--queries-file", default=QUERIES_PATH)
+    parser.add_argument("--synthetic", type=int, help="index N synthetic vectors instead of Chroma")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200, help="held-out synthetic queries")
+    parser.add_argument("--k", type=int, nargs="+", default=[2, 5, 10])
+    parser.add_argument("--modes", nargs="+", default=list(QUANTIZED_MODES))
+    args = parser.parse_args()
+
+    if args.synthetic:
+        # Draw index and queries together, then keep the queries out of the index
+        vectors = synthetic_vectors(args.synthetic + args.queries, args.dim)
+        vectors, queries = vectors[:args.synthetic], vectors[args.synthetic:]
+        documents = [Document(page_content=f"synthetic chunk {i}") for i in range(len(vectors))]
+    else:
+        vectors, documents = chroma_collection(args.vectorstore)
+        queries = embedded_queries(args.queries_file)
+    vectors, queries = _normalize_rows(vectors), _normalize_rows(queries)
+    max_k = max(args.k)
+
+    truth = exact_top_k(vectors, queries, max_k)
+
+    print(f"Vectors: {len(vectors)} x {vectors.shape[1]}, held-out queries: {len(queries)}")
+    header = f"{'index':<12} {'memory MiB':>11} {'build s':>8} {'p50 ms':>8} {'p95 ms':>8}"
+    header += "".join(f" {'recall@' + str(k):>10}" for k in args.k)
+    print(header)
+
+    import faiss
+
+    for kind in ("flat", "hnsw"):
+        started = time.perf_counter()
+        index = float32_index(vectors, kind)
+        build_s = time.perf_counter() - started
+        params = faiss.SearchParametersHNSW(efSearch=max(64, max_k)) if kind == "hnsw" else None
+        found, latencies = timed_search(
+            lambda query: index.search(query.reshape(1, -1), max_k, params=params)[1][0], queries
+        )
+        report(f"float32 {kind}", faiss.serialize_index(index).nbytes, build_s,
+               found, latencies, truth, args.k)
+        del index
+
+    for mode in args.modes:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "index")
+            started = time.perf_counter()
+            store = QuantizedVectorStore.from_embeddings(vectors, documents, None, mode, path)
+            build_s = time.perf_counter() - started
+
+            for label, exact in ((mode, True), (f"{mode} raw", False)):
+                found, latencies = timed_search(
+                    lambda query: store.index.search(query, max_k, exact=exact)[0], queries
+                )
+                report(label, store.memory_bytes(), build_s, found, latencies, truth, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# profile_imports.py
+"""
+Report the import-time cost of the app's modules.
+
+Runs each target module in a fresh interpreter with ``python -X importtime``
+and prints the slowest imports by cumulative time, so regressions in
+startup cost are easy to spot.
+
+Usage:
+    python scripts/profile_imports.py
+    python scripts/profile_imports.py agent.planning_agent app --top 30
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+DEFAULT_MODULES = [
+    "agent.config",
+    "agent.router_agent",
+    "agent.generic_agent",
+    "agent.product_review_agent",
+    "agent.composer_agent",
+    "agent.planning_agent",
+    "app",
+]
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def profile_module(module: str) -> Tuple[List[Tuple[str, int, int]], str]:
+    """Import module in a subprocess and return (name, self_us, cumulative_us) rows"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    errors = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            errors.append(line)
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # header line
+        rows.append((fields[2].strip(), int(fields[0]), int(fields[1])))
+    error = "\n".join(errors).strip() if proc.returncode else ""
+    return rows, error
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile import-time cost per module")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=15, help="dependencies to list per module")
+    args = parser.parse_args()
+
+    print(f"{'module':<32} {'total ms':>10}")
+    print("-" * 43)
+    details = {}
+    for module in args.modules:
+        rows, error = profile_module(module)
+        if error:
+            print(f"{module:<32} {'FAILED':>10}")
+            details[module] = error.splitlines()[-1]
+            continue
+        total = next((cum for name, _, cum in rows if name == module), 0)
+        print(f"{module:<32} {total / 1000:>10.1f}")
+        details[module] = sorted(rows, key=lambda row: row[2], reverse=True)[:args.top]
+
+    for module, detail in details.items():
+        print(f"\n{module}")
+        if isinstance(detail, str):
+            print(f"  import failed: {detail}")
+            continue
+        print(f"  {'import':<50} {'self ms':>9} {'cum ms':>9}")
+        for name, self_us, cum_us in detail:
+            print(f"  {name:<50} {self_us / 1000:>9.1f} {cum_us / 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import threading
+import time
+
+from admission import (
+    AdmissionController,
+    TokenBucket,
+    BUSY_MESSAGE,
+    RATE_LIMITED_MESSAGE,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _hold_slot(controller, session_id="holder"):
+    """Occupy one concurrency slot until the returned event is set"""
+    started, release = threading.Event(), threading.Event()
+
+    def handler():
+        started.set()
+        release.wait()
+        return "done"
+
+    thread = threading.Thread(target=controller.run, args=(session_id, "hold", handler))
+    thread.start()
+    started.wait()
+    return release, thread
+
+
+def _run_in_thread(controller, session_id, query="hello", handler=lambda: "ok"):
+    """Start controller.run in a thread; the result is appended to the returned list"""
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(controller.run(session_id, query, handler))
+    )
+    thread.start()
+    return thread, results
+
+
+def _wait_for_metric(controller, name, value, timeout=5.0):
+    give_up = time.monotonic() + timeout
+    while controller.metrics()[name] != value:
+        assert time.monotonic() < give_up, f"{name} never reached {value}"
+        time.sleep(0.001)
+
+
+def test_admits_and_returns_handler_result():
+    controller = AdmissionController(max_concurrency=2, max_queue=2)
+    assert controller.run("s1", "hello", lambda: "answer") == "answer"
+    metrics = controller.metrics()
+    assert metrics["admitted"] == 1
+    assert metrics["completed"] == 1
+    assert metrics["in_flight"] == 0
+
+
+def test_sheds_when_queue_is_full():
+    controller = AdmissionController(max_concurrency=1, max_queue=0)
+    release, thread = _hold_slot(controller)
+    try:
+        response = controller.run("s2", "hello", lambda: "should not run")
+    finally:
+        release.set()
+        thread.join()
+
+    assert response == BUSY_MESSAGE
+    assert controller.metrics()["shed_queue_full"] == 1
+
+
+def test_sheds_after_waiting_past_deadline():
+    clock = FakeClock()
+    controller = AdmissionController(max_concurrency=1, max_queue=4, deadline=5, clock=clock)
+    release, holder = _hold_slot(controller)
+    waiter, results = _run_in_thread(controller, "s2", handler=lambda: "should not run")
+    _wait_for_metric(controller, "queue_depth", 1)
+
+    clock.now += 6
+    release.set()
+    holder.join()
+    waiter.join()
+
+    assert results == [BUSY_MESSAGE]
+    metrics = controller.metrics()
+    assert metrics["shed_deadline"] == 1
+    assert metrics["queue_depth"] == 0
+
+
+def test_one_session_waits_for_its_own_request_without_holding_slots():
+    controller = AdmissionController(max_concurrency=2, max_queue=4, session_burst=4)
+    release, holder = _hold_slot(controller, session_id="busy")
+    waiters = [_run_in_thread(controller, "busy") for _ in range(3)]
+    _wait_for_metric(controller, "session_waiting", 3)
+
+    # The busy session's extra requests hold no slot, so another session is admitted
+    assert controller.metrics()["in_flight"] == 1
+    assert controller.run("other", "hello", lambda: "answer") == "answer"
+
+    release.set()
+    holder.join()
+    for thread, results in waiters:
+        thread.join()
+        assert results == ["ok"]
+    assert controller.metrics()["shed_deadline"] == 0
+
+
+def test_session_never_has_two_requests_in_flight():
+    controller = AdmissionController(max_concurrency=4, max_queue=8, session_burst=8)
+    in_flight, peak = [0], [0]
+    lock = threading.Lock()
+
+    def handler():
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.005)
+        with lock:
+            in_flight[0] -= 1
+        return "ok"
+
+    threads = [_run_in_thread(controller, "same", handler=handler) for _ in range(6)]
+    for thread, results in threads:
+        thread.join()
+        assert results == ["ok"]
+    assert peak[0] == 1
+
+
+def test_rejects_early_when_expected_wait_exceeds_deadline():
+    clock = FakeClock()
+    controller = AdmissionController(max_concurrency=1, max_queue=4, deadline=5, clock=clock)
+
+    def slow_handler():
+        clock.now += 30
+        return "slow"
+
+    controller.run("s1", "warm up", slow_handler)
+    release, thread = _hold_slot(controller)
+    try:
+        response = controller.run("s2", "hello", lambda: "should not run")
+    finally:
+        release.set()
+        thread.join()
+
+    assert response == BUSY_MESSAGE
+    assert controller.metrics()["shed_deadline"] == 1
+
+
+def test_rate_limits_per_session():
+    clock = FakeClock()
+    controller = AdmissionController(session_rate_per_minute=60, session_burst=2, clock=clock)
+
+    assert controller.run("a", "hi", lambda: "ok") == "ok"
+    assert controller.run("a", "hi", lambda: "ok") == "ok"
+    assert controller.run("a", "hi", lambda: "ok") == RATE_LIMITED_MESSAGE
+    # Other sessions have their own bucket
+    assert controller.run("b", "hi", lambda: "ok") == "ok"
+    # One token refills per second
+    clock.now += 1
+    assert controller.run("a", "hi", lambda: "ok") == "ok"
+    assert controller.metrics()["shed_rate_limited"] == 1
+
+
+def test_shed_requests_get_fast_path_answer_not_other_sessions_responses():
+    clock = FakeClock()
+    controller = AdmissionController(session_rate_per_minute=60, session_burst=1, clock=clock)
+
+    controller.run("a", "yes", lambda: "Your order #123 has shipped.")
+    controller.run("b", "Yes.", lambda: "ok")
+    assert controller.run("b", "Yes.", lambda: "ok") == RATE_LIMITED_MESSAGE
+
+    tracking = controller.run("b", "Where is my order?", lambda: "ok")
+    assert "tracking number" in tracking
+    assert controller.metrics()["degraded_fast_path"] == 1
+
+
+def test_idle_buckets_are_evicted():
+    clock = FakeClock()
+    controller = AdmissionController(session_rate_per_minute=60, session_burst=2, clock=clock)
+    for session in ("a", "b", "c"):
+        controller.run(session, "hi", lambda: "ok")
+    assert controller.metrics()["sessions_tracked"] == 3
+
+    clock.now += 10
+    controller.run("d", "hi", lambda: "ok")
+    assert controller.metrics()["sessions_tracked"] == 1
+
+
+def test_token_bucket_caps_at_capacity():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1.0, capacity=2, clock=clock)
+    clock.now += 100
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+
+def test_shed_requests_without_a_supported_answer_get_busy_message():
+    clock = FakeClock()
+    controller = AdmissionController(session_rate_per_minute=60, session_burst=1, clock=clock)
+
+    controller.run("a", "hi", lambda: "ok")
+    assert controller.run("a", "Can I return this for a refund?", lambda: "ok") == RATE_LIMITED_MESSAGE
+    assert controller.metrics()["degraded_fast_path"] == 0
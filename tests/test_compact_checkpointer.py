@@ -0,0 +1,146 @@
+import contextlib
+import io
+import sys
+import threading
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import HumanMessage
+
+import agent.generic_agent as generic_agent
+import agent.planning_agent as planning_agent
+import agent.router_agent as router_agent
+from agent.compact_checkpointer import CompactMemorySaver
+from app import State
+
+ANSWER = "The running shoes are in stock and ship within two business days."
+
+
+class _FakeProductAgent:
+    def process_review_query(self, state, config):
+        return {"review_response": ANSWER}
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    def install():
+        router_llm = FakeListChatModel(responses=["generic", "product_review"])
+        answer_llm = FakeListChatModel(responses=[ANSWER])
+        monkeypatch.setattr(router_agent, "get_chat_model", lambda model_name: router_llm)
+        monkeypatch.setattr(generic_agent, "get_chat_model", lambda model_name: answer_llm)
+        monkeypatch.setattr(planning_agent, "setup_product_review_agent", _FakeProductAgent)
+    return install
+
+
+def _run(mode, fake_models, turns=6, thread_id="session"):
+    fake_models()
+    graph, memory = planning_agent.setup_agent_graph(State, checkpoint_mode=mode)
+    config = {"configurable": {"thread_id": thread_id}}
+    for turn in range(turns):
+        message = HumanMessage(content=f"Question {turn} about running shoes", id=f"q{turn}")
+        with contextlib.redirect_stdout(io.StringIO()):
+            graph.invoke({"messages": [message]}, config=config)
+    return graph, memory, config
+
+
+def _normalize(values):
+    """State values without generated message IDs; cleared channels are omitted in compact mode"""
+    normalized = {key: value for key, value in values.items() if value is not None}
+    if "messages" in normalized:
+        normalized["messages"] = [(m.type, m.content) for m in normalized["messages"]]
+    return normalized
+
+
+def _snapshot(snapshot):
+    return (
+        _normalize(snapshot.values),
+        snapshot.next,
+        snapshot.metadata["step"],
+        snapshot.metadata["source"],
+    )
+
+
+def test_state_and_history_match_full_checkpointer(fake_models):
+    full_graph, _, config = _run("full", fake_models)
+    compact_graph, compact_memory, _ = _run("compact", fake_models)
+    assert isinstance(compact_memory, CompactMemorySaver)
+
+    assert _snapshot(compact_graph.get_state(config)) == _snapshot(full_graph.get_state(config))
+
+    full_history = [_snapshot(s) for s in full_graph.get_state_history(config)]
+    compact_history = [_snapshot(s) for s in compact_graph.get_state_history(config)]
+    assert compact_history == full_history
+    assert len(_normalize(compact_graph.get_state(config).values)["messages"]) == 12
+
+
+def test_delete_thread_releases_message_bodies(fake_models):
+    graph, memory, first = _run("compact", fake_models, turns=3, thread_id="first")
+    second = {"configurable": {"thread_id": "second"}}
+    with contextlib.redirect_stdout(io.StringIO()):
+        graph.invoke({"messages": [HumanMessage(content="Question 0 about running shoes", id="q0")]}, config=second)
+    shared_bodies = len(memory.message_bodies)
+
+    memory.delete_thread("first")
+    assert 0 < len(memory.message_bodies) < shared_bodies
+    messages = graph.get_state(second).values["messages"]
+    assert [m.content for m in messages][0] == "Question 0 about running shoes"
+
+    memory.delete_thread("second")
+    assert memory.message_bodies == {}
+    assert memory.storage_bytes() == 0
+
+
+def test_concurrent_delete_keeps_bodies_other_threads_intern():
+    # Switch threads often so unguarded read-modify-writes interleave
+    previous_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    memory = CompactMemorySaver()
+    serde = memory.serde
+    messages = [HumanMessage(content=f"Shared question {i}", id=f"s{i}") for i in range(50)]
+    errors = []
+
+    def intern_all(thread_id):
+        with serde.for_thread(thread_id):
+            for message in messages:
+                serde.intern(message)
+
+    def churn(worker):
+        try:
+            for round_ in range(200):
+                intern_all(f"short-lived-{worker}-{round_}")
+                serde.release(f"short-lived-{worker}-{round_}")
+        except Exception as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=churn, args=(worker,)) for worker in range(4)]
+    try:
+        for worker in workers:
+            worker.start()
+        for _ in range(20):
+            intern_all("live")
+        for worker in workers:
+            worker.join()
+    finally:
+        sys.setswitchinterval(previous_interval)
+
+    assert errors == []
+    assert set(serde.thread_digests) == {"live"}
+    assert len(memory.message_bodies) == len(messages)
+    assert set(serde.refcounts.values()) == {1}
+
+
+def test_clear_context_deletes_the_clients_thread(fake_models):
+    from app import AgentManager
+
+    fake_models()
+    manager = AgentManager()
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert manager.process_query("Question about running shoes", [], "client-a") == ANSWER
+    config = {"configurable": {"thread_id": "client-a"}}
+    assert manager.graph.get_state(config).values["messages"]
+    assert manager.memory.message_bodies
+
+    assert manager.clear_context("client-a") == ([], "")
+    assert manager.graph.get_state(config).values == {}
+    assert manager.memory.message_bodies == {}
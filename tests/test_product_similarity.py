@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agent.product_similarity import (
+    ChunkResolver,
+    SimilarProducts,
+    build_similar_products,
+    build_similarity_table,
+    department_depths,
+    encode_summaries,
+    product_index_of,
+    save_similarity_table,
+)
+
+
+def _brute_force_neighbors(embeddings, top_n):
+    vectors = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    scores = vectors @ vectors.T
+    np.fill_diagonal(scores, -np.inf)
+    return np.argsort(-scores, axis=1)[:, :top_n]
+
+
+def test_exact_matches_brute_force_within_one_category():
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((300, 16)).astype(np.float32)
+    paths = ["men shoes running"] * 300
+
+    table = build_similarity_table(
+        np.arange(300), embeddings, paths, top_n=5, candidates=20, block_size=64
+    )
+    assert np.array_equal(table["neighbors"], _brute_force_neighbors(embeddings, 5))
+
+
+def test_deeper_shared_category_outranks_closer_embedding():
+    embeddings = np.array(
+        [[1.0, 0.0], [0.99, 0.1], [0.8, 0.6], [0.95, 0.3], [0.0, 1.0]], dtype=np.float32
+    )
+    paths = [
+        "clothing shoes jewelry men shoes athletic running",
+        "clothing shoes jewelry men shoes boots",             # closest, but shares only 'men shoes'
+        "clothing shoes jewelry men shoes athletic running",  # further, but same leaf
+        "clothing shoes jewelry women clothing dresses",      # same department only
+        "electronics headphones earbuds",                     # other department
+    ]
+    table = build_similarity_table(
+        [10, 11, 12, 13, 14], embeddings, paths, top_n=3, candidates=4, min_subcategory_words=1
+    )
+    assert table["neighbors"][0].tolist() == [12, 11, -1]
+    assert table["neighbors"][4].tolist() == [-1, -1, -1]
+
+
+def test_department_depth_on_shipped_categories():
+    categories = pd.read_csv("data/cleaned_dataset_full.csv", usecols=["categories"])["categories"]
+    paths = categories.astype(str).tolist()
+    depth_of = {}
+    for path, depth in zip(paths, department_depths(paths)):
+        depth_of.setdefault(path.split()[0], " ".join(path.split()[:depth]))
+
+    assert depth_of["clothing"] == "clothing shoes jewelry"
+    assert depth_of["home"] == "home kitchen"
+    assert depth_of["electronics"] == "electronics"
+    assert depth_of["automotive"] == "automotive"
+
+    # Products sharing only their department are never paired
+    rng = np.random.default_rng(2)
+    table = build_similarity_table(
+        np.arange(len(paths)), rng.standard_normal((len(paths), 8)).astype(np.float32), paths,
+        top_n=5, candidates=len(paths) - 1,
+    )
+    depths = department_depths(paths)
+    for row, neighbors in enumerate(table["neighbors"]):
+        words = paths[row].split()
+        for neighbor in neighbors[neighbors >= 0]:
+            other = paths[neighbor].split()
+            assert words[:depths[row] + 1] == other[:depths[row] + 1]
+
+
+def test_hnsw_candidates_agree_with_exact():
+    pytest.importorskip("faiss")
+    rng = np.random.default_rng(1)
+    embeddings = rng.standard_normal((500, 32)).astype(np.float32)
+    paths = ["home kitchen"] * 500
+
+    exact = build_similarity_table(np.arange(500), embeddings, paths, top_n=5, method="exact")
+    approx = build_similarity_table(np.arange(500), embeddings, paths, top_n=5, method="hnsw")
+    overlap = np.mean([
+        len(set(a) & set(b)) / 5 for a, b in zip(exact["neighbors"], approx["neighbors"])
+    ])
+    assert overlap > 0.9
+
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError):
+        build_similarity_table([0, 1], np.eye(2), ["a b", "a b"], method="lsh")
+
+
+def test_product_index_from_metadata_or_leading_field():
+    assert product_index_of("title: kettle", {"product_index": 7}) == 7
+    assert product_index_of("index: 42 title: kettle") == 42
+    assert product_index_of("price: 10 reviews: 3") is None
+
+
+def test_continuation_chunks_resolve_through_table(tmp_path):
+    resolver = ChunkResolver.from_chunks([
+        ("index: 3 title: kettle", 3),
+        ("...continued description of the kettle", 3),
+        ("...second half of a blender review", 5),
+    ])
+    table = build_similarity_table([3, 5], np.eye(2), ["home kitchen", "home kitchen"], top_n=1)
+    table.update(resolver.arrays())
+    table.update(encode_summaries(["title: kettle", "title: blender"]))
+    path = str(tmp_path / "similar.npz")
+    save_similarity_table(table, path)
+
+    similar = SimilarProducts.load(path)
+    assert similar.product_of("...second half of a blender review", {}) == 5
+    assert similar.product_of("...continued description of the kettle") == 3
+    assert similar.product_of("an unrelated chunk") is None
+    assert similar.lookup(3) == [5]
+    assert similar.lookup(99) == []
+    assert similar.summary(5) == "title: blender"
+    assert similar.summary(99) is None
+
+
+class FakeVectorstore:
+    """Serves chunk embeddings through Chroma's paged get()"""
+
+    def __init__(self, vectors, texts, metadatas):
+        self.vectors, self.texts, self.metadatas = vectors, texts, metadatas
+
+    def get(self, include=None, limit=None, offset=0):
+        end = offset + limit
+        return {
+            "embeddings": self.vectors[offset:end],
+            "documents": self.texts[offset:end],
+            "metadatas": self.metadatas[offset:end],
+        }
+
+
+def test_build_similar_products_from_a_vectorstore(tmp_path):
+    texts = ["index: 1 kettle", "...kettle continued", "index: 2 teapot", "...blender", "orphan"]
+    vectors = np.array([[1, 0], [1, 0.1], [0.9, 0.2], [0, 1], [0.5, 0.5]], dtype=np.float32)
+    metadatas = [{}, {}, {}, {"product_index": 3}, {}]
+    catalogue = {
+        1: ("home kitchen kettles", "title: kettle"),
+        2: ("home kitchen kettles", "title: teapot"),
+        3: ("home kitchen blenders", "title: blender"),
+    }
+    path = str(tmp_path / "similar.npz")
+
+    table = build_similar_products(
+        FakeVectorstore(vectors, texts, metadatas),
+        [("...kettle continued", 1)],
+        catalogue, path=path, top_n=2, page_size=2,
+    )
+    assert table["product_ids"].tolist() == [1, 2, 3]
+    similar = SimilarProducts.load(path)
+    assert similar.lookup(1) == [2]
+    assert similar.lookup(3) == []
+    assert similar.summary(2) == "title: teapot"
+
+
+def test_build_similar_products_from_empty_vectorstore(tmp_path):
+    path = str(tmp_path / "similar.npz")
+    empty = FakeVectorstore(np.zeros((0, 2)), [], [])
+    assert build_similar_products(empty, [], {1: ("a b", "title: a")}, path=path) == {}
+    assert SimilarProducts.load(path) is None
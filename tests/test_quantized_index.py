@@ -0,0 +1,151 @@
+import os
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+pytest.importorskip("faiss")
+
+from agent.quantized_index import DocumentFile, INDEX_FILES, QuantizedIndex, QuantizedVectorStore
+
+
+class FakeChroma:
+    """Serves stored embeddings through Chroma's paged get()"""
+
+    embeddings = None
+
+    def __init__(self, vectors, texts):
+        self.vectors = vectors
+        self.texts = texts
+
+    def get(self, include=None, limit=None, offset=0):
+        end = len(self.texts) if limit is None else offset + limit
+        return {
+            "embeddings": self.vectors[offset:end],
+            "documents": self.texts[offset:end],
+            "metadatas": [{"product_index": i} for i in range(offset, min(end, len(self.texts)))],
+        }
+
+
+def _clustered(size, dim=192, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((size // 4, dim)).astype(np.float32)
+    return centers[rng.integers(0, len(centers), size)] + 0.5 * rng.standard_normal((size, dim)).astype(np.float32)
+
+
+@pytest.mark.parametrize("mode", ["int8", "pq"])
+def test_held_out_queries_match_exact_search(mode):
+    vectors = _clustered(2100)
+    indexed, queries = vectors[:2000], vectors[2000:]
+    index = QuantizedIndex.build(indexed, mode)
+
+    unit = indexed / np.linalg.norm(indexed, axis=1, keepdims=True)
+    recall = []
+    for query in queries:
+        truth = np.argsort(-(unit @ (query / np.linalg.norm(query))))[:5]
+        ids, scores = index.search(query, 5)
+        assert np.all(np.diff(scores) <= 1e-6)
+        recall.append(len(set(ids) & set(truth)) / 5)
+    assert np.mean(recall) > 0.9
+
+
+def test_empty_collection_returns_no_results(tmp_path):
+    path = str(tmp_path / "quantized")
+    store = QuantizedVectorStore.from_chroma(FakeChroma(np.zeros((0, 8)), []), "int8", path)
+
+    assert store.similarity_search_by_vector([0.1] * 8, k=2) == []
+    assert store.max_marginal_relevance_search_by_vector([0.1] * 8, k=2) == []
+    assert not QuantizedVectorStore.exists(path)
+
+
+def test_save_writes_every_file_and_replaces_previous_index(tmp_path):
+    path = str(tmp_path / "quantized")
+    vectors = _clustered(400)
+    texts = [f"chunk {i}" for i in range(400)]
+
+    QuantizedVectorStore.from_chroma(FakeChroma(vectors[:200], texts[:200]), "int8", path, page_size=64)
+    assert QuantizedVectorStore.exists(path)
+    store = QuantizedVectorStore.from_chroma(FakeChroma(vectors, texts), "int8", path, page_size=64)
+
+    assert sorted(os.listdir(path)) == sorted(INDEX_FILES)
+    assert os.listdir(tmp_path) == ["quantized"]  # no staging directories left behind
+    assert len(QuantizedVectorStore.load(path, None).documents) == 400
+    assert isinstance(store.index.vectors, np.memmap)
+    assert isinstance(store.documents, DocumentFile)
+
+    os.remove(os.path.join(path, "documents.jsonl"))
+    assert not QuantizedVectorStore.exists(path)
+
+
+def test_loaded_store_reads_only_returned_documents(tmp_path):
+    path = str(tmp_path / "quantized")
+    vectors = _clustered(400)
+    texts = [f"chunk {i} é" for i in range(400)]
+    store = QuantizedVectorStore.from_chroma(FakeChroma(vectors, texts), "int8", path)
+
+    hits = store.similarity_search_by_vector(vectors[123], k=1)
+    assert hits[0].page_content == "chunk 123 é"
+    assert hits[0].metadata == {"product_index": 123}
+    assert store.documents[-1].page_content == "chunk 399 é"
+    assert store.memory_bytes() == store.index.memory_bytes()
+
+
+def test_search_does_not_change_shared_index_settings():
+    vectors = _clustered(2000)
+    index = QuantizedIndex.build(vectors, "int8")
+    ef_search = index.index.hnsw.efSearch
+    index.search(vectors[0], 10)
+    assert index.index.hnsw.efSearch == ef_search
+
+
+def test_memory_includes_documents():
+    vectors = _clustered(200)
+    small = QuantizedVectorStore.from_embeddings(vectors, [Document(page_content="a")] * 200, None)
+    large = QuantizedVectorStore.from_embeddings(vectors, [Document(page_content="a" * 1000)] * 200, None)
+    assert large.memory_bytes() - small.memory_bytes() >= 999 * 200
+
+
+def test_get_pages_documents_and_embeddings():
+    vectors = _clustered(100)
+    store = QuantizedVectorStore.from_chroma(FakeChroma(vectors, [f"chunk {i}" for i in range(100)]))
+    page = store.get(limit=30, offset=90)
+    assert page["documents"] == [f"chunk {i}" for i in range(90, 100)]
+    assert page["embeddings"].shape == (10, 192)
+    assert store.get(limit=10, offset=100)["documents"] == []
+
+
+def test_raw_search_returns_quantized_order_without_reranking():
+    vectors = _clustered(2000)
+    index = QuantizedIndex.build(vectors, "int8")
+    query = vectors[7] + 0.1
+
+    ids, scores = index.search(query, 5, exact=False)
+    assert len(ids) == 5
+    assert np.all(np.diff(scores) <= 1e-6)
+    # Scores come from the 8-bit codes, not the float vectors
+    exact = np.asarray(index.vectors[ids]) @ (query / np.linalg.norm(query))
+    assert not np.allclose(scores, exact, atol=1e-7)
+
+
+def test_failed_swap_keeps_previous_index(tmp_path, monkeypatch):
+    path = str(tmp_path / "quantized")
+    vectors = _clustered(400)
+    texts = [f"chunk {i}" for i in range(400)]
+    QuantizedVectorStore.from_chroma(FakeChroma(vectors[:200], texts[:200]), "int8", path)
+
+    rename = os.rename
+
+    def failing_rename(source, destination):
+        staging = os.path.basename(source).startswith(".quantized-") and not source.endswith(".old")
+        if staging and destination == path:
+            raise OSError("disk full")
+        return rename(source, destination)
+
+    monkeypatch.setattr(os, "rename", failing_rename)
+    with pytest.raises(OSError):
+        QuantizedVectorStore.from_chroma(FakeChroma(vectors, texts), "int8", path)
+    monkeypatch.undo()
+
+    assert QuantizedVectorStore.exists(path)
+    assert len(QuantizedVectorStore.load(path, None).documents) == 200
+    assert os.listdir(tmp_path) == ["quantized"]